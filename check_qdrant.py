@@ -2,6 +2,7 @@
 Check Qdrant collection for duplicates and missing chunks
 Compares chunks in cache files against points stored in Qdrant
 """
+import ijson
 import json
 import os
 from qdrant_client import QdrantClient
@@ -108,17 +109,18 @@ class QdrantChecker:
             Logger.log(f"Cache file not found when loading missing chunks: {cache_path}")
             return loaded
         try:
-            with open(cache_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            chunk_type = data.get('chunk_type', chunk_type_hint)
-            chunks = data.get('chunks', [])
-            for chunk_dict in chunks:
-                cid = str(chunk_dict.get('id'))
-                if cid not in missing_ids:
-                    continue
-                chunk_obj = self._reconstruct_chunk(chunk_dict, chunk_type)
-                if chunk_obj:
-                    loaded[cid] = chunk_obj
+            # Stream the cache so only one chunk dict is materialized at a time;
+            # the header fields are written before the chunks array, so this stops early
+            with open(cache_path, 'rb') as f:
+                chunk_type = next(ijson.items(f, 'chunk_type'), chunk_type_hint)
+                f.seek(0)
+                for chunk_dict in ijson.items(f, 'chunks.item', use_float=True):
+                    cid = str(chunk_dict.get('id'))
+                    if cid not in missing_ids:
+                        continue
+                    chunk_obj = self._reconstruct_chunk(chunk_dict, chunk_type)
+                    if chunk_obj:
+                        loaded[cid] = chunk_obj
         except Exception as e:
             Logger.log(f"Error loading missing chunks from {cache_path}: {e}")
         return loaded
@@ -203,11 +205,9 @@ class QdrantChecker:
                 continue
             
             try:
-                with open(cache_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                
-                chunks = data.get('chunks', [])
-                chunk_ids = {chunk['id'] for chunk in chunks}
+                # Only the ids are needed, so stream them instead of loading every chunk
+                with open(cache_path, 'rb') as f:
+                    chunk_ids = set(ijson.items(f, 'chunks.item.id'))
                 chunk_ids_by_chunker[chunker_name] = chunk_ids
                 Logger.log(f"✓ Loaded {len(chunk_ids)} chunk IDs from {chunker_name} cache")
                 
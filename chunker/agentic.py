@@ -1,7 +1,13 @@
 from logger import Logger
+import hashlib
+import io
+import sys
 import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 from langchain_core.prompts import ChatPromptTemplate
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import Optional, List
 from langchain_core.documents import Document
 import os
@@ -10,62 +16,472 @@ from .base import BaseChunker
 from typing import Dict
 from model.chunk.agentic_chunk import AgenticChunk
 from utils import json_parser as utils
+from utils.embedding_cache import EmbeddingCache
+from utils.llm_cache import SemanticLLMCache
+from utils.model_registry import get_sentence_transformer, embedding_variant
+
+# Prompts are static, so they are built once at import instead of on every LLM call
+
+_PROPOSITIONS_PROMPT = ChatPromptTemplate.from_messages(
+    [
+        (
+            "system",
+            """
+            Uraikan "Konten" dokumen hukum menjadi proposisi yang jelas dan sederhana, pastikan proposisi tersebut 
+            dapat dipahami di luar konteks aslinya.
+            
+            1. Pisahkan kalimat majemuk menjadi kalimat-kalimat sederhana. Pertahankan frasa asli dari input 
+            sebisa mungkin.
+            
+            2. Untuk setiap entitas bernama (nama orang, lembaga, peraturan, pasal, dll.) yang disertai informasi 
+            deskriptif tambahan, pisahkan informasi ini menjadi proposisi tersendiri.
+            
+            3. Decontekstualisasikan proposisi dengan menambahkan modifier yang diperlukan pada kata benda atau 
+            seluruh kalimat, dan ganti kata ganti (misalnya, "ini", "itu", "ia", "mereka", "tersebut") dengan 
+            nama lengkap entitas yang dirujuk.
+            
+            4. Kembalikan output dalam format ini:
+            {{
+                "propositions": [
+                "proposisi 1",
+                "proposisi 2",
+                ...
+                ]
+            }}
+
+            JANGAN sertakan penjelasan apapun, markdown code fences, atau teks di luar JSON.
+
+            Contoh:
+
+            Input: Judul: Undang-Undang Cipta Kerja. Bagian: Ketentuan Umum, Definisi Pekerja. Konten:
+            Undang-Undang Nomor 11 Tahun 2020 tentang Cipta Kerja disahkan pada tanggal 2 November 2020 
+            oleh Presiden Joko Widodo. Undang-undang ini mengatur berbagai aspek ketenagakerjaan termasuk 
+            definisi pekerja. Dalam undang-undang ini, pekerja didefinisikan sebagai setiap orang yang bekerja 
+            dengan menerima upah atau imbalan dalam bentuk lain. Pekerja dapat bekerja berdasarkan perjanjian 
+            kerja waktu tertentu atau perjanjian kerja waktu tidak tertentu. Pengusaha wajib memberikan jaminan 
+            sosial kepada pekerja sesuai ketentuan peraturan perundang-undangan.
+            
+            Output: [
+            "Undang-Undang Nomor 11 Tahun 2020 adalah tentang Cipta Kerja.",
+            "Undang-Undang Nomor 11 Tahun 2020 tentang Cipta Kerja disahkan pada tanggal 2 November 2020.",
+            "Undang-Undang Nomor 11 Tahun 2020 tentang Cipta Kerja disahkan oleh Presiden Joko Widodo.",
+            "Undang-Undang Cipta Kerja mengatur berbagai aspek ketenagakerjaan.",
+            "Undang-Undang Cipta Kerja mengatur definisi pekerja.",
+            "Dalam Undang-Undang Cipta Kerja, pekerja didefinisikan sebagai setiap orang yang bekerja dengan menerima upah atau imbalan dalam bentuk lain.",
+            "Pekerja dapat bekerja berdasarkan perjanjian kerja waktu tertentu.",
+            "Pekerja dapat bekerja berdasarkan perjanjian kerja waktu tidak tertentu.",
+            "Pengusaha wajib memberikan jaminan sosial kepada pekerja.",
+            "Kewajiban pengusaha memberikan jaminan sosial sesuai ketentuan peraturan perundang-undangan."
+            ]
+            """
+        ),
+        ("user", "Uraikan konten hukum berikut:: {input}"),
+    ]
+)
+
+_SUMMARY_UPDATE_PROMPT = ChatPromptTemplate.from_messages(
+    [
+        (
+            "system",
+            """
+            Anda adalah pengelola kumpulan chunk yang merepresentasikan kelompok proposisi hukum yang membahas 
+            topik serupa.
+            
+            Sebuah proposisi baru saja ditambahkan ke salah satu chunk Anda. Anda harus membuat ringkasan sangat 
+            singkat dalam 1 kalimat yang menginformasikan pembaca tentang isi kelompok chunk tersebut.
+
+            Ringkasan yang baik akan menjelaskan tentang apa chunk tersebut, dan memberikan instruksi klarifikasi 
+            tentang apa yang harus ditambahkan ke chunk tersebut.
+
+            Anda akan diberikan sekelompok proposisi yang ada dalam chunk dan ringkasan chunk saat ini.
+
+            Ringkasan Anda harus mengantisipasi generalisasi. Jika Anda mendapat proposisi tentang Pasal 1, 
+            generalisasikan ke "ketentuan pasal". Atau jika tentang hak pekerja, generalisasikan ke "hak dan 
+            kewajiban tenaga kerja".
+
+            Contoh:
+            Input: Proposisi: Pasal 27 UUD 1945 menjamin hak setiap warga negara untuk mendapatkan pekerjaan
+            Output: Chunk ini berisi informasi tentang ketentuan hak warga negara terkait pekerjaan dalam UUD 1945.
+
+            Hanya berikan ringkasan chunk baru, tidak ada yang lain.
+            """,
+        ),
+        ("user", "Proposisi dalam Chunk:\n{proposition}\n\nRingkasan chunk saat ini:\n{current_summary}"),
+    ]
+)
+
+_TITLE_UPDATE_PROMPT = ChatPromptTemplate.from_messages(
+    [
+        (
+            "system",
+            """
+            Anda adalah pengelola kumpulan chunk yang merepresentasikan kelompok proposisi hukum yang membahas 
+            topik serupa.
+            
+            Sebuah proposisi baru saja ditambahkan ke salah satu chunk Anda. Anda harus membuat judul chunk yang 
+            sangat singkat dan diperbarui yang menginformasikan pembaca tentang isi kelompok chunk tersebut.
+
+            Judul yang baik akan menjelaskan tentang apa chunk tersebut.
+
+            Anda akan diberikan sekelompok proposisi yang ada dalam chunk, ringkasan chunk, dan judul chunk.
+
+            Judul Anda harus mengantisipasi generalisasi. Jika Anda mendapat proposisi tentang Pasal 1, 
+            generalisasikan ke "Ketentuan Pasal". Atau jika tentang putusan pengadilan, generalisasikan ke 
+            "Yurisprudensi & Putusan".
+
+            Contoh:
+            Input: Ringkasan: Chunk ini berisi informasi tentang tanggal dan waktu pemberlakuan peraturan
+            Output: Tanggal Berlaku Peraturan
+
+            Hanya berikan judul chunk baru, tidak ada yang lain.
+            """,
+        ),
+        ("user", "Proposisi dalam Chunk:\n{proposition}\n\nRingkasan chunk:\n{current_summary}\n\nJudul chunk saat ini:\n{current_title}"),
+    ]
+)
+
+_TITLE_SUMMARY_UPDATE_PROMPT = ChatPromptTemplate.from_messages(
+    [
+        (
+            "system",
+            """
+            Anda adalah pengelola kumpulan chunk yang merepresentasikan kelompok proposisi hukum yang membahas 
+            topik serupa.
+            
+            Beberapa proposisi baru saja ditambahkan ke salah satu chunk Anda. Perbarui ringkasan dan judul chunk 
+            tersebut sekaligus.
+
+            Ringkasan: sangat singkat dalam 1 kalimat, menjelaskan tentang apa chunk tersebut dan apa yang harus 
+            ditambahkan ke chunk tersebut. Judul: sangat singkat (beberapa kata).
+
+            Keduanya harus mengantisipasi generalisasi. Jika Anda mendapat proposisi tentang Pasal 1, 
+            generalisasikan ke "ketentuan pasal". Atau jika tentang hak pekerja, generalisasikan ke "hak dan 
+            kewajiban tenaga kerja".
+
+            Output harus dalam format JSON:
+            {{
+                "summary": "ringkasan chunk baru",
+                "title": "judul chunk baru"
+            }}
+
+            Contoh Output:
+            {{"summary": "Chunk ini berisi informasi tentang ketentuan hak warga negara terkait pekerjaan dalam UUD 1945.", "title": "Hak Warga Negara atas Pekerjaan"}}
+
+            JANGAN sertakan penjelasan, alasan, atau teks apapun di luar JSON.
+            """,
+        ),
+        ("user", "Proposisi dalam Chunk:\n{proposition}\n\nRingkasan chunk saat ini:\n{current_summary}\n\nJudul chunk saat ini:\n{current_title}"),
+    ]
+)
+
+_NEW_CHUNK_SUMMARY_PROMPT = ChatPromptTemplate.from_messages(
+    [
+        (
+            "system",
+            """
+            Anda adalah pengelola kumpulan chunk yang merepresentasikan kelompok proposisi hukum yang membahas 
+            topik serupa.
+            
+            Anda harus membuat ringkasan sangat singkat dalam 1 kalimat yang menginformasikan pembaca tentang 
+            isi kelompok chunk tersebut.
+
+            Ringkasan yang baik akan menjelaskan tentang apa chunk tersebut, dan memberikan instruksi klarifikasi 
+            tentang apa yang harus ditambahkan ke chunk tersebut.
+
+            Anda akan diberikan proposisi yang akan masuk ke chunk baru. Chunk baru ini memerlukan ringkasan.
+
+            Ringkasan Anda harus mengantisipasi generalisasi. Jika Anda mendapat proposisi tentang sanksi pidana, 
+            generalisasikan ke "ketentuan sanksi". Atau jika tentang januari 2020, generalisasikan ke "tanggal 
+            dan waktu".
+
+            Contoh:
+            Input: Proposisi: Pasal 88 mengatur tentang sanksi pidana penjara minimal 5 tahun
+            Output: Chunk ini berisi informasi tentang ketentuan sanksi pidana dalam peraturan.
+
+            Hanya berikan ringkasan chunk baru, tidak ada yang lain.
+            """,
+        ),
+        ("user", "Tentukan ringkasan chunk baru dimana proposisi ini akan masuk:\n{proposition}"),
+    ]
+)
+
+_NEW_CHUNK_TITLE_PROMPT = ChatPromptTemplate.from_messages(
+    [
+        (
+            "system",
+            """
+            Anda adalah pengelola kumpulan chunk yang merepresentasikan kelompok proposisi hukum yang membahas 
+            topik serupa.
+            
+            Anda harus membuat judul chunk yang sangat singkat (beberapa kata) yang menginformasikan pembaca 
+            tentang isi kelompok chunk tersebut.
+
+            Judul chunk yang baik adalah singkat tetapi mencakup tentang apa chunk tersebut.
+
+            Anda akan diberikan ringkasan dari chunk yang memerlukan judul.
+
+            Judul Anda harus mengantisipasi generalisasi. Jika Anda mendapat proposisi tentang UU Ketenagakerjaan, 
+            generalisasikan ke "Peraturan Ketenagakerjaan". Atau jika tentang Maret 2020, generalisasikan ke 
+            "Tanggal & Waktu".
+
+            Contoh:
+            Input: Ringkasan: Chunk ini berisi informasi tentang tanggal dan waktu pemberlakuan undang-undang
+            Output: Tanggal & Waktu Pemberlakuan
+
+            Hanya berikan judul chunk baru, tidak ada yang lain.
+            """,
+        ),
+        ("user", "Tentukan judul chunk dimana ringkasan ini termasuk:\n{summary}"),
+    ]
+)
+
+_FIND_SIMILAR_CHUNK_PROMPT = ChatPromptTemplate.from_messages(
+    [
+        (
+            "system",
+            """
+            Tentukan apakah "Proposisi" hukum harus masuk ke salah satu chunk yang sudah ada atau tidak.
+            
+            Chunk merepresentasikan kelompok proposisi yang membahas topik serupa.
+            
+            Input:
+            1. Proposisi baru
+            2. Kumpulan chunk yang ada (ID, Judul, dan Ringkasan)
+            
+            Output harus dalam format JSON:
+            {{
+                "chunk_id": "id-chunk-yang-cocok-atau-null"
+            }}
+            
+            Jika proposisi cocok dengan salah satu chunk yang ada, kembalikan ID chunk tersebut.
+            Jika proposisi TIDAK cocok dengan chunk manapun, kembalikan null.
+            
+            JANGAN sertakan penjelasan, alasan, atau teks apapun di luar JSON.
+            JANGAN gunakan markdown code fences seperti ```json.
+            
+            Contoh Output 1 (cocok):
+            {{"chunk_id": "12"}}
+            
+            Contoh Output 2 (tidak cocok):
+            {{"chunk_id": null}}
+            """,
+        ),
+        ("user", "Chunk Saat Ini:\n--Awal chunk saat ini--\n{current_chunk_outline}\n--Akhir chunk saat ini--"),
+        ("user", "Tentukan apakah proposisi berikut harus masuk ke salah satu chunk yang diuraikan:\n{proposition}"),
+    ]
+)
+
+
+_ASSIGNED_PROPOSITIONS_PROMPT = ChatPromptTemplate.from_messages(
+    [
+        (
+            "system",
+            """
+            Uraikan "Konten" dokumen hukum menjadi proposisi yang jelas dan sederhana, lalu tentukan chunk 
+            tujuan setiap proposisi dalam satu langkah.
+            
+            1. Pisahkan kalimat majemuk menjadi kalimat-kalimat sederhana dan decontekstualisasikan setiap 
+            proposisi (ganti kata ganti dengan nama lengkap entitas yang dirujuk) agar dapat dipahami di luar 
+            konteks aslinya.
+            
+            2. Untuk setiap proposisi, jika cocok dengan salah satu chunk yang ada, isi "chunk_id" dengan ID 
+            chunk tersebut. Jika tidak cocok dengan chunk manapun, isi "chunk_id" dengan null.
+            
+            3. Isi "title" dan "summary" dengan judul dan ringkasan chunk tujuan SETELAH proposisi ditambahkan. 
+            Judul singkat (beberapa kata), ringkasan satu kalimat yang menggeneralisasi topik chunk. 
+            Proposisi baru yang membahas topik sama harus memakai judul yang sama persis.
+            
+            4. Kembalikan output dalam format ini:
+            {{
+                "propositions": [
+                {{"text": "proposisi 1", "chunk_id": "12", "title": "judul", "summary": "ringkasan"}},
+                {{"text": "proposisi 2", "chunk_id": null, "title": "judul", "summary": "ringkasan"}},
+                ...
+                ]
+            }}
+
+            JANGAN sertakan penjelasan apapun, markdown code fences, atau teks di luar JSON.
+            """
+        ),
+        ("user", "Chunk Saat Ini:\n--Awal chunk saat ini--\n{current_chunk_outline}\n--Akhir chunk saat ini--"),
+        ("user", "Uraikan konten hukum berikut:: {input}"),
+    ]
+)
+
+
+# Response schemas, defined once so pydantic builds each validator a single time
+
+class _Sentences(BaseModel):
+    propositions: list[str]
+
+
+class _AssignedProposition(BaseModel):
+    model_config = ConfigDict(coerce_numbers_to_str=True)
+    text: str
+    chunk_id: Optional[str] = None
+    title: Optional[str] = None
+    summary: Optional[str] = None
+
+
+class _AssignedPropositions(BaseModel):
+    propositions: list[_AssignedProposition]
+
+
+class _TitleSummary(BaseModel):
+    title: str
+    summary: str
+
+
+class _ChunkMatch(BaseModel):
+    # The outline shows numeric ids, which the LLM often returns as JSON numbers
+    model_config = ConfigDict(coerce_numbers_to_str=True)
+    chunk_id: Optional[str] = None
+
 
 class AgenticChunker(BaseChunker):
-    def __init__(self, llm: BaseLLM, cache_dir: str = "./chunk_cache"):
+    def __init__(self,
+                 llm: BaseLLM,
+                 cache_dir: str = "./chunk_cache",
+                 embedding_model_name: Optional[str] = None,
+                 match_threshold: float = 0.85,
+                 new_chunk_threshold: float = 0.7,
+                 candidate_limit: int = 3,
+                 concurrency: int = 8,
+                 batch_assignment: bool = False,
+                 use_llm_cache: bool = True,
+                 summary_refresh_interval: int = 1):
         super().__init__(cache_dir=cache_dir, chunker_name="agentic")
         self.llm = llm
+        self.concurrency = max(1, concurrency)
+        # One LLM call per page that extracts propositions together with their target chunk,
+        # title and summary, instead of several matching/titling calls per proposition
+        self.batch_assignment = batch_assignment
+        # Titles/summaries of chunks that received propositions are regenerated every this many
+        # pages (and once at the end); larger values trade matching freshness for fewer LLM calls
+        self.summary_refresh_interval = max(1, summary_refresh_interval)
+        
+        # Optional embedding prefilter for _find_similar_chunk: a confident match (or clear miss)
+        # is decided by cosine similarity alone, only the ambiguous band goes to the LLM
+        self.embedding_model = None
+        self.embedding_cache = None
+        self.embedding_model_name = embedding_model_name
+        if embedding_model_name:
+            Logger.log(f"Loading embedding model for chunk matching: {embedding_model_name}")
+            self.embedding_model = get_sentence_transformer(embedding_model_name)
+            # Verbatim-repeated propositions and unchanged titles/summaries are served from here
+            self.embedding_cache = EmbeddingCache(os.path.join(cache_dir, "embeddings.db"), self._embedding_key())
+        # Responses of the templated prompts below, reused across runs; near-duplicate inputs are
+        # matched by embedding when an embedding model is configured
+        self.llm_cache = None
+        if use_llm_cache:
+            self.llm_cache = SemanticLLMCache(
+                os.path.join(cache_dir, "llm_cache.db"),
+                getattr(llm, "model_name", type(llm).__name__),
+                embed_fn=self._embed_texts if self.embedding_model is not None else None
+            )
+        self.match_threshold = match_threshold
+        self.new_chunk_threshold = new_chunk_threshold
+        self.candidate_limit = candidate_limit
+        # Normalized title + summary embeddings kept as one contiguous (capacity, d) buffer,
+        # row i belongs to _chunk_emb_ids[i] and only the first len(_chunk_emb_ids) rows are live
+        self._chunk_emb_ids: List[str] = []
+        self._chunk_emb_rows: Dict[str, int] = {}
+        self._chunk_embs: Optional[np.ndarray] = None
+        # Memoized get_chunks() outline, extended when a chunk is created and rebuilt when one changes
+        self._outline_cache: Optional[str] = None
+        self._outline_dirty = True
+        # Short outline ids (chunk index) -> chunk UUID, keeps prompts small and ids easy to copy
+        self._alias_to_id: Dict[str, str] = {}
+        # Per-chunk outline lines, dropped when that chunk's title/summary changes
+        self._chunk_line_cache: Dict[str, str] = {}
+        # Proposition text -> id of the chunk holding it, used to drop verbatim duplicates
+        self._proposition_owner: Dict[str, str] = {}
+        # Chunks whose title/summary are stale after receiving propositions (ordered set)
+        self._dirty_chunks: Dict[str, None] = {}
+        
         self.current_page = None
         # Track chunk IDs created while processing a single document
         # Initialized to None and set to a list at the start of processing each document
         self.current_doc_chunk_ids = None
+        # Existing chunks whose propositions/title/summary changed while processing the current document
+        self.current_doc_updated_ids = None
     
     def load_data_to_chunks(self, pages: list[Document], use_cache: bool = True):
-        # Load existing cache
-        if use_cache:
-            self._load_consolidated_cache()
-            if len(self.chunks) > 0:
-                Logger.log(f"Loaded {len(self.chunks)} chunks from cache")
-        
-        # Filter uncached documents
-        uncached_pages = self.get_uncached_documents(pages)
-        if len(uncached_pages) < len(pages):
-            Logger.log(f"Skipping {len(pages) - len(uncached_pages)} already processed documents")
-        
+        # Load existing cache and keep only documents that still need chunking
+        uncached_pages = self._get_pages_to_process(pages, use_cache)
         if not uncached_pages:
-            Logger.log("All documents already processed")
             return
         
+        self._outline_dirty = True
+        for chunk in self.chunks.values():
+            for proposition in chunk.propositions:
+                self._proposition_owner.setdefault(proposition, chunk.id)
+        
         Logger.log(f"Processing {len(uncached_pages)} new documents with agentic chunking...")
         
-        checkpoint_interval = 25  # Save every 25 documents
+        checkpoint_interval = 25  # Flush the journal every 25 documents
         processed_count = 0
         
+        # Proposition extraction is one independent LLM call per page, so keep up to
+        # `concurrency` of them in flight. Assigning propositions to chunks mutates
+        # self.chunks and stays sequential, in page order. Batch assignment extracts and
+        # assigns in one call that needs the live outline, so it is not prefetched.
+        executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        pending = deque()
+        page_iter = iter(enumerate(uncached_pages, 1))
+        
+        def submit_next():
+            next_page = next(page_iter, None)
+            if next_page is not None:
+                idx, page = next_page
+                future = None if self.batch_assignment else executor.submit(self._extract_propositions, page)
+                pending.append((idx, page, future))
+        
         try:
-            for idx, page in enumerate(uncached_pages, 1):
+            for _ in range(1 if self.batch_assignment else self.concurrency):
+                submit_next()
+            
+            while pending:
+                idx, page, future = pending.popleft()
+                submit_next()
                 try:
+                    if self.batch_assignment:
+                        # Built now, after the previous page's assignments were applied
+                        propositions = self._extract_assigned_propositions(page, self.get_chunks())
+                    else:
+                        propositions = future.result()
+                    
                     # Prepare per-document tracking for newly created chunk IDs
                     self.current_doc_chunk_ids = []
+                    self.current_doc_updated_ids = []
                     self.current_page = page
                     
-                    self._generate_propositions(page)
+                    if self.batch_assignment:
+                        self._add_assigned_propositions(propositions, page)
+                    else:
+                        self._add_propositions(propositions, page)
                     
-                    # Mark document as processed
-                    self.mark_document_processed(page)
+                    refreshed_ids = []
+                    if (processed_count + 1) % self.summary_refresh_interval == 0:
+                        refreshed_ids = self._refresh_dirty_chunks()
+                    
+                    # Mark document as processed and journal only what this document touched
+                    doc_hash = self.mark_document_processed(page)
+                    touched_ids = list(dict.fromkeys(self.current_doc_chunk_ids + self.current_doc_updated_ids + refreshed_ids))
+                    self._append_to_journal(doc_hash, touched_ids)
                     # Clear per-document tracking after processing
                     self.current_doc_chunk_ids = None
+                    self.current_doc_updated_ids = None
                     processed_count += 1
                     
-                    # Checkpoint save every N documents
+                    # Checkpoint every N documents
                     if idx % checkpoint_interval == 0:
-                        Logger.log(f"Checkpoint: Saving progress ({idx}/{len(uncached_pages)} documents)...")
-                        self._save_consolidated_cache()
-                        Logger.log(f"Checkpoint saved. Total chunks so far: {len(self.chunks)}")
+                        self._flush_journal()
+                        Logger.log("Checkpoint (%d/%d documents). Total chunks so far: %d", idx, len(uncached_pages), len(self.chunks))
                     
                 except Exception as e:
                     Logger.log(f"Error processing document {idx}/{len(uncached_pages)}: {e}")
-                    Logger.log(f"Saving progress before continuing...")
-                    self._save_consolidated_cache()
+                    self._flush_journal()
                     Logger.log(f"Progress saved. Skipping problematic document.")
                     continue
         
@@ -74,127 +490,123 @@ class AgenticChunker(BaseChunker):
             self._save_consolidated_cache()
             Logger.log(f"Progress saved: {processed_count}/{len(uncached_pages)} documents processed")
             raise
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+            # Pages that failed keep no hash memo entry (and no page reference) past this call
+            self._doc_hash_memo.clear()
+        
+        # Chunks still waiting for a deferred title/summary refresh
+        refreshed_ids = self._refresh_dirty_chunks()
+        if refreshed_ids:
+            self._append_to_journal(None, refreshed_ids)
         
         Logger.log(f"Total chunks: {len(self.chunks)} (added {processed_count} documents)")
         
-        # Final save
+        # Final save compacts the journal into the consolidated cache
         self._save_consolidated_cache()
     
     def _generate_propositions(self, page: Document) -> list[str]:
+        propositions = self._extract_propositions(page)
+        self._add_propositions(propositions, page)
+        self._refresh_dirty_chunks()
+        return propositions
+    
+    def _extract_propositions(self, page: Document) -> list[str]:
+        """Ask the LLM to split a page into propositions (safe to run from worker threads)"""
         text = page.page_content
-        PROMPT = ChatPromptTemplate.from_messages(
-            [
-                (
-                    "system",
-                    """
-                    Uraikan "Konten" dokumen hukum menjadi proposisi yang jelas dan sederhana, pastikan proposisi tersebut 
-                    dapat dipahami di luar konteks aslinya.
-                    
-                    1. Pisahkan kalimat majemuk menjadi kalimat-kalimat sederhana. Pertahankan frasa asli dari input 
-                    sebisa mungkin.
-                    
-                    2. Untuk setiap entitas bernama (nama orang, lembaga, peraturan, pasal, dll.) yang disertai informasi 
-                    deskriptif tambahan, pisahkan informasi ini menjadi proposisi tersendiri.
-                    
-                    3. Decontekstualisasikan proposisi dengan menambahkan modifier yang diperlukan pada kata benda atau 
-                    seluruh kalimat, dan ganti kata ganti (misalnya, "ini", "itu", "ia", "mereka", "tersebut") dengan 
-                    nama lengkap entitas yang dirujuk.
-                    
-                    4. Kembalikan output dalam format ini:
-                    {{
-                        "propositions": [
-                        "proposisi 1",
-                        "proposisi 2",
-                        ...
-                        ]
-                    }}
-
-                    JANGAN sertakan penjelasan apapun, markdown code fences, atau teks di luar JSON.
-
-                    Contoh:
-
-                    Input: Judul: Undang-Undang Cipta Kerja. Bagian: Ketentuan Umum, Definisi Pekerja. Konten:
-                    Undang-Undang Nomor 11 Tahun 2020 tentang Cipta Kerja disahkan pada tanggal 2 November 2020 
-                    oleh Presiden Joko Widodo. Undang-undang ini mengatur berbagai aspek ketenagakerjaan termasuk 
-                    definisi pekerja. Dalam undang-undang ini, pekerja didefinisikan sebagai setiap orang yang bekerja 
-                    dengan menerima upah atau imbalan dalam bentuk lain. Pekerja dapat bekerja berdasarkan perjanjian 
-                    kerja waktu tertentu atau perjanjian kerja waktu tidak tertentu. Pengusaha wajib memberikan jaminan 
-                    sosial kepada pekerja sesuai ketentuan peraturan perundang-undangan.
-                    
-                    Output: [
-                    "Undang-Undang Nomor 11 Tahun 2020 adalah tentang Cipta Kerja.",
-                    "Undang-Undang Nomor 11 Tahun 2020 tentang Cipta Kerja disahkan pada tanggal 2 November 2020.",
-                    "Undang-Undang Nomor 11 Tahun 2020 tentang Cipta Kerja disahkan oleh Presiden Joko Widodo.",
-                    "Undang-Undang Cipta Kerja mengatur berbagai aspek ketenagakerjaan.",
-                    "Undang-Undang Cipta Kerja mengatur definisi pekerja.",
-                    "Dalam Undang-Undang Cipta Kerja, pekerja didefinisikan sebagai setiap orang yang bekerja dengan menerima upah atau imbalan dalam bentuk lain.",
-                    "Pekerja dapat bekerja berdasarkan perjanjian kerja waktu tertentu.",
-                    "Pekerja dapat bekerja berdasarkan perjanjian kerja waktu tidak tertentu.",
-                    "Pengusaha wajib memberikan jaminan sosial kepada pekerja.",
-                    "Kewajiban pengusaha memberikan jaminan sosial sesuai ketentuan peraturan perundang-undangan."
-                    ]
-                    """
-                ),
-                ("user", "Uraikan konten hukum berikut:: {input}"),
-            ]
-        )
-        result = self.llm.answer(PROMPT, {"input": text})
+        result = self._answer("propositions", _PROPOSITIONS_PROMPT, {"input": text})
         
-        class Sentences (BaseModel):
-            propositions: list[str]
-        sentences = utils.parse_json_response(result, Sentences)
+        sentences = utils.parse_json_response(result, _Sentences)
         
         if sentences is None:
             Logger.log("No propositions generated.")
             return []
-        
-        # `page` dalam konteks ini adalah (index, Document). Kita perlu mengambil Document
-        # Jika Anda memperbaiki `load_data_to_chunks` (seperti di atas), ini akan menjadi objek Document
-        if isinstance(page, tuple):
-            page_document = page[1]
-        else:
-            page_document = page
-
-        for proposition in sentences.propositions:
-            self.add_proposition(proposition, page_document)
-            
         return sentences.propositions
+    
+    def _add_propositions(self, propositions: list[str], page: Document):
+        for proposition in propositions:
+            self.add_proposition(proposition, page)
 
     
+    def _extract_assigned_propositions(self, page: Document, outline: str) -> list:
+        """Split a page into propositions already grouped into chunks (safe to run from worker threads)"""
+        result = self._answer("assigned_propositions", _ASSIGNED_PROPOSITIONS_PROMPT, {
+            "input": page.page_content,
+            "current_chunk_outline": outline
+        })
+        
+        assigned = utils.parse_json_response(result, _AssignedPropositions)
+        
+        if assigned is None:
+            Logger.log("No propositions generated.")
+            return []
+        return assigned.propositions
+    
+    def _add_assigned_propositions(self, assigned: list, page: Document):
+        """Apply the chunk assignments returned by _extract_assigned_propositions"""
+        # Propositions of this page marked as new but sharing a title go into the same new chunk
+        new_chunk_by_title: Dict[str, str] = {}
+        
+        for item in assigned:
+            proposition = item.text
+            if proposition in self._proposition_owner:
+                Logger.debug("Proposition already stored in chunk %s, skipping", self._proposition_owner[proposition])
+                continue
+            if len(proposition) < 128:
+                proposition = sys.intern(proposition)
+            
+            chunk_id = self._resolve_chunk_alias(item.chunk_id)
+            if chunk_id is None and item.title:
+                chunk_id = new_chunk_by_title.get(item.title)
+            
+            if chunk_id is None:
+                chunk_id = self._create_chunk(proposition, page, title=item.title, summary=item.summary)
+                if item.title:
+                    new_chunk_by_title[item.title] = chunk_id
+                continue
+            
+            self.add_proposition_to_chunk(chunk_id, proposition)
+            if item.title and item.summary:
+                # The LLM already rewrote title/summary with this proposition in view
+                self._dirty_chunks.pop(chunk_id, None)
+                self._set_chunk_title_summary(chunk_id, item.title, item.summary)
+        # Chunks the LLM gave no title/summary for stay dirty and get the regular refresh
+    
+    def _set_chunk_title_summary(self, chunk_id: str, title: str, summary: str):
+        chunk = self.chunks[chunk_id]
+        if chunk.title == title and chunk.summary == summary:
+            return
+        chunk.title = title
+        chunk.summary = summary
+        self._chunk_line_cache.pop(chunk_id, None)
+        self._outline_dirty = True
+        self._index_chunks([chunk_id])
+    
+    def _answer(self, template_id: str, prompt: ChatPromptTemplate, inputs: Dict, semantic: bool = False) -> str:
+        """self.llm.answer behind the response cache (exact match unless semantic)"""
+        if self.llm_cache is None:
+            return self.llm.answer(prompt, inputs)
+        return self.llm_cache.answer(template_id, inputs, lambda: self.llm.answer(prompt, inputs), semantic=semantic)
+    
+    def _update_chunk_title_summary(self, chunk: AgenticChunk) -> tuple[str, str]:
+        """Regenerate title and summary of a chunk in one LLM call (safe to run from worker threads)"""
+        result = self._answer("title_summary_update", _TITLE_SUMMARY_UPDATE_PROMPT, {
+            "proposition": "\n".join(chunk.propositions),
+            "current_summary": chunk.summary,
+            "current_title": chunk.title
+        })
+        
+        updated = utils.parse_json_response(result, _TitleSummary)
+        
+        if updated is None:
+            # Fall back to the separate prompts rather than leaving the chunk stale
+            summary = self._update_chunk_summary(chunk)
+            return self._update_chunk_title(chunk.model_copy(update={"summary": summary})), summary
+        return updated.title, updated.summary
+    
     def _update_chunk_summary(self, chunk: AgenticChunk) -> str: # Menerima AgenticChunk
         """If you add a new proposition to a chunk, you may want to update the summary or else they could get stale"""
-        PROMPT = ChatPromptTemplate.from_messages(
-            [
-                (
-                    "system",
-                    """
-                    Anda adalah pengelola kumpulan chunk yang merepresentasikan kelompok proposisi hukum yang membahas 
-                    topik serupa.
-                    
-                    Sebuah proposisi baru saja ditambahkan ke salah satu chunk Anda. Anda harus membuat ringkasan sangat 
-                    singkat dalam 1 kalimat yang menginformasikan pembaca tentang isi kelompok chunk tersebut.
-
-                    Ringkasan yang baik akan menjelaskan tentang apa chunk tersebut, dan memberikan instruksi klarifikasi 
-                    tentang apa yang harus ditambahkan ke chunk tersebut.
-
-                    Anda akan diberikan sekelompok proposisi yang ada dalam chunk dan ringkasan chunk saat ini.
-
-                    Ringkasan Anda harus mengantisipasi generalisasi. Jika Anda mendapat proposisi tentang Pasal 1, 
-                    generalisasikan ke "ketentuan pasal". Atau jika tentang hak pekerja, generalisasikan ke "hak dan 
-                    kewajiban tenaga kerja".
-
-                    Contoh:
-                    Input: Proposisi: Pasal 27 UUD 1945 menjamin hak setiap warga negara untuk mendapatkan pekerjaan
-                    Output: Chunk ini berisi informasi tentang ketentuan hak warga negara terkait pekerjaan dalam UUD 1945.
-
-                    Hanya berikan ringkasan chunk baru, tidak ada yang lain.
-                    """,
-                ),
-                ("user", "Proposisi dalam Chunk:\n{proposition}\n\nRingkasan chunk saat ini:\n{current_summary}"),
-            ]
-        )
-
-        new_chunk_summary = self.llm.answer(PROMPT, {
+        new_chunk_summary = self._answer("summary_update", _SUMMARY_UPDATE_PROMPT, {
             "proposition": "\n".join(chunk.propositions),
             "current_summary" : chunk.summary
         })
@@ -203,37 +615,7 @@ class AgenticChunker(BaseChunker):
     
     def _update_chunk_title(self, chunk: AgenticChunk) -> str: # Menerima AgenticChunk
         """If you add a new proposition to a chunk, you may want to update the title or else it can get stale"""
-        PROMPT = ChatPromptTemplate.from_messages(
-            [
-                (
-                    "system",
-                    """
-                    Anda adalah pengelola kumpulan chunk yang merepresentasikan kelompok proposisi hukum yang membahas 
-                    topik serupa.
-                    
-                    Sebuah proposisi baru saja ditambahkan ke salah satu chunk Anda. Anda harus membuat judul chunk yang 
-                    sangat singkat dan diperbarui yang menginformasikan pembaca tentang isi kelompok chunk tersebut.
-
-                    Judul yang baik akan menjelaskan tentang apa chunk tersebut.
-
-                    Anda akan diberikan sekelompok proposisi yang ada dalam chunk, ringkasan chunk, dan judul chunk.
-
-                    Judul Anda harus mengantisipasi generalisasi. Jika Anda mendapat proposisi tentang Pasal 1, 
-                    generalisasikan ke "Ketentuan Pasal". Atau jika tentang putusan pengadilan, generalisasikan ke 
-                    "Yurisprudensi & Putusan".
-
-                    Contoh:
-                    Input: Ringkasan: Chunk ini berisi informasi tentang tanggal dan waktu pemberlakuan peraturan
-                    Output: Tanggal Berlaku Peraturan
-
-                    Hanya berikan judul chunk baru, tidak ada yang lain.
-                    """,
-                ),
-                ("user", "Proposisi dalam Chunk:\n{proposition}\n\nRingkasan chunk:\n{current_summary}\n\nJudul chunk saat ini:\n{current_title}"),
-            ]
-        )
-        
-        new_chunk_title = self.llm.answer(PROMPT, {
+        new_chunk_title = self._answer("title_update", _TITLE_UPDATE_PROMPT, {
             "proposition": "\n".join(chunk.propositions), # Mengakses properti
             "current_summary" : chunk.summary, # Mengakses properti
             "current_title" : chunk.title # Mengakses properti
@@ -243,85 +625,26 @@ class AgenticChunker(BaseChunker):
     
     # ... Metode _get_new_chunk_summary (tidak berubah) ...
     def _get_new_chunk_summary(self, proposition: str) -> str:
-        PROMPT = ChatPromptTemplate.from_messages(
-            [
-                (
-                    "system",
-                    """
-                    Anda adalah pengelola kumpulan chunk yang merepresentasikan kelompok proposisi hukum yang membahas 
-                    topik serupa.
-                    
-                    Anda harus membuat ringkasan sangat singkat dalam 1 kalimat yang menginformasikan pembaca tentang 
-                    isi kelompok chunk tersebut.
-
-                    Ringkasan yang baik akan menjelaskan tentang apa chunk tersebut, dan memberikan instruksi klarifikasi 
-                    tentang apa yang harus ditambahkan ke chunk tersebut.
-
-                    Anda akan diberikan proposisi yang akan masuk ke chunk baru. Chunk baru ini memerlukan ringkasan.
-
-                    Ringkasan Anda harus mengantisipasi generalisasi. Jika Anda mendapat proposisi tentang sanksi pidana, 
-                    generalisasikan ke "ketentuan sanksi". Atau jika tentang januari 2020, generalisasikan ke "tanggal 
-                    dan waktu".
-
-                    Contoh:
-                    Input: Proposisi: Pasal 88 mengatur tentang sanksi pidana penjara minimal 5 tahun
-                    Output: Chunk ini berisi informasi tentang ketentuan sanksi pidana dalam peraturan.
-
-                    Hanya berikan ringkasan chunk baru, tidak ada yang lain.
-                    """,
-                ),
-                ("user", "Tentukan ringkasan chunk baru dimana proposisi ini akan masuk:\n{proposition}"),
-            ]
-        )
-
-        
-        new_chunk_summary = self.llm.answer(PROMPT, {
+        new_chunk_summary = self._answer("new_chunk_summary", _NEW_CHUNK_SUMMARY_PROMPT, {
             "proposition": proposition
-        })
+        }, semantic=True)
 
         return new_chunk_summary
     
     # ... Metode _get_new_chunk_title (tidak berubah) ...
     def _get_new_chunk_title(self, summary) -> str:
-        PROMPT = ChatPromptTemplate.from_messages(
-            [
-                (
-                    "system",
-                    """
-                    Anda adalah pengelola kumpulan chunk yang merepresentasikan kelompok proposisi hukum yang membahas 
-                    topik serupa.
-                    
-                    Anda harus membuat judul chunk yang sangat singkat (beberapa kata) yang menginformasikan pembaca 
-                    tentang isi kelompok chunk tersebut.
-
-                    Judul chunk yang baik adalah singkat tetapi mencakup tentang apa chunk tersebut.
-
-                    Anda akan diberikan ringkasan dari chunk yang memerlukan judul.
-
-                    Judul Anda harus mengantisipasi generalisasi. Jika Anda mendapat proposisi tentang UU Ketenagakerjaan, 
-                    generalisasikan ke "Peraturan Ketenagakerjaan". Atau jika tentang Maret 2020, generalisasikan ke 
-                    "Tanggal & Waktu".
-
-                    Contoh:
-                    Input: Ringkasan: Chunk ini berisi informasi tentang tanggal dan waktu pemberlakuan undang-undang
-                    Output: Tanggal & Waktu Pemberlakuan
-
-                    Hanya berikan judul chunk baru, tidak ada yang lain.
-                    """,
-                ),
-                ("user", "Tentukan judul chunk dimana ringkasan ini termasuk:\n{summary}"),
-            ]
-        )
-
-        new_chunk_title = self.llm.answer(PROMPT, {
+        new_chunk_title = self._answer("new_chunk_title", _NEW_CHUNK_TITLE_PROMPT, {
             "summary": summary
-        })
+        }, semantic=True)
         return new_chunk_title
     
-    def _create_chunk(self, proposition: str, page: Document) -> str:
+    def _create_chunk(self, proposition: str, page: Document,
+                      title: Optional[str] = None, summary: Optional[str] = None) -> str:
         id = str(uuid.uuid4())
-        summary = self._get_new_chunk_summary(proposition)
-        title = self._get_new_chunk_title(summary)
+        if not summary:
+            summary = self._get_new_chunk_summary(proposition)
+        if not title:
+            title = self._get_new_chunk_title(summary)
         
         # MEMBUAT OBJEK AgenticChunk BARU
         new_chunk = AgenticChunk(
@@ -334,87 +657,261 @@ class AgenticChunker(BaseChunker):
         )
 
         self.chunks[id] = new_chunk
+        self._proposition_owner.setdefault(proposition, id)
+        if self._outline_dirty or not self._outline_cache:
+            self._outline_dirty = True
+        else:
+            # New chunks go last in the outline, so extend it instead of rebuilding every line
+            self._outline_cache = f"{self._outline_cache}\n{self._get_chunk_line(id)}"
+        self._index_chunks([id])
         
         # Track this chunk for current document
         if self.current_doc_chunk_ids is not None:
             self.current_doc_chunk_ids.append(id)
         
-        Logger.log(f"Created new chunk with ID: {id}, Title: {title}, Summary: {summary}")
+        Logger.log("Created new chunk with ID: %s, Title: %s, Summary: %s", id, title, summary)
         return id # Mengembalikan ID untuk konsistensi
     
-    def get_chunks(self) -> str:
-        # Menggunakan properti dari objek AgenticChunk
-        chunks = "\n".join([f"Chunk ID: {chunk.id}, Judul: {chunk.title}, Ringkasan: {chunk.summary}" for chunk in self.chunks.values()])
-        return chunks
+    def get_chunks(self, chunk_ids: Optional[List[str]] = None) -> str:
+        if chunk_ids is None:
+            if self._outline_dirty or self._outline_cache is None:
+                self._outline_cache = "\n".join([self._get_chunk_line(chunk_id) for chunk_id in self.chunks])
+                self._outline_dirty = False
+            return self._outline_cache
+        return "\n".join([self._get_chunk_line(chunk_id) for chunk_id in chunk_ids])
     
-    def _find_similar_chunk(self, proposition: str):
-        chunks = self.get_chunks()
-        
-        PROMPT = ChatPromptTemplate.from_messages(
-            [
-                (
-                    "system",
-                    """
-                    Tentukan apakah "Proposisi" hukum harus masuk ke salah satu chunk yang sudah ada atau tidak.
-                    
-                    Chunk merepresentasikan kelompok proposisi yang membahas topik serupa.
-                    
-                    Input:
-                    1. Proposisi baru
-                    2. Kumpulan chunk yang ada (ID, Judul, dan Ringkasan)
-                    
-                    Output harus dalam format JSON:
-                    {{
-                        "chunk_id": "id-chunk-yang-cocok-atau-null"
-                    }}
-                    
-                    Jika proposisi cocok dengan salah satu chunk yang ada, kembalikan ID chunk tersebut.
-                    Jika proposisi TIDAK cocok dengan chunk manapun, kembalikan null.
-                    
-                    JANGAN sertakan penjelasan, alasan, atau teks apapun di luar JSON.
-                    JANGAN gunakan markdown code fences seperti ```json.
-                    
-                    Contoh Output 1 (cocok):
-                    {{"chunk_id": "91c6850b-7fed-456b-bb98-656b552b8e68"}}
-                    
-                    Contoh Output 2 (tidak cocok):
-                    {{"chunk_id": null}}
-                    """,
-                ),
-                ("user", "Chunk Saat Ini:\n--Awal chunk saat ini--\n{current_chunk_outline}\n--Akhir chunk saat ini--"),
-                ("user", "Tentukan apakah proposisi berikut harus masuk ke salah satu chunk yang diuraikan:\n{proposition}"),
-            ]
+    def _get_chunk_line(self, chunk_id: str) -> str:
+        """Outline line of one chunk, formatted once and reused until the chunk changes"""
+        line = self._chunk_line_cache.get(chunk_id)
+        if line is None:
+            # Menggunakan properti dari objek AgenticChunk
+            chunk = self.chunks[chunk_id]
+            line = f"Chunk ID: {self._get_chunk_alias(chunk)}, Judul: {chunk.title}, Ringkasan: {chunk.summary}"
+            self._chunk_line_cache[chunk_id] = line
+        return line
+    
+    def _get_chunk_alias(self, chunk: AgenticChunk) -> str:
+        """Short id shown to the LLM instead of the 36-character UUID (the chunk's index when unique)"""
+        alias = str(chunk.index)
+        owner = self._alias_to_id.setdefault(alias, chunk.id)
+        return alias if owner == chunk.id else chunk.id
+    
+    def _embed_texts(self, texts: List[str]) -> np.ndarray:
+        return self.embedding_cache.encode(texts, self._encode_texts)
+    
+    def _encode_texts(self, texts: List[str]) -> np.ndarray:
+        vectors = self.embedding_model.encode(
+            texts,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=False
         )
+        return vectors.astype(np.float32, copy=False)
+    
+    def _index_chunks(self, chunk_ids: List[str]):
+        """Embed title + summary of the given chunks into the similarity matrix"""
+        if self.embedding_model is None or not chunk_ids:
+            return
+        
+        vectors = self._embed_texts([f"{self.chunks[chunk_id].title}\n{self.chunks[chunk_id].summary}" for chunk_id in chunk_ids])
+        
+        self._reserve_chunk_rows(len(chunk_ids), vectors.shape[1])
+        for chunk_id, vector in zip(chunk_ids, vectors):
+            row = self._chunk_emb_rows.get(chunk_id)
+            if row is None:
+                row = len(self._chunk_emb_ids)
+                self._chunk_emb_rows[chunk_id] = row
+                self._chunk_emb_ids.append(chunk_id)
+            self._chunk_embs[row] = vector
+    
+    def _reserve_chunk_rows(self, extra: int, dim: int):
+        """Grow the embedding buffer geometrically so appending a chunk never copies the whole matrix"""
+        needed = len(self._chunk_emb_ids) + extra
+        if self._chunk_embs is None:
+            self._chunk_embs = np.empty((max(needed, 64), dim), dtype=np.float32)
+        elif needed > len(self._chunk_embs):
+            grown = np.empty((max(needed, 2 * len(self._chunk_embs)), dim), dtype=np.float32)
+            grown[:len(self._chunk_emb_ids)] = self._chunk_embs[:len(self._chunk_emb_ids)]
+            self._chunk_embs = grown
+    
+    def _sync_chunk_index(self):
+        """Index chunks that were loaded from cache and have no embedding yet"""
+        if len(self._chunk_emb_rows) == len(self.chunks):
+            return
+        if self._chunk_embs is None:
+            self._load_chunk_index()
+            if len(self._chunk_emb_rows) == len(self.chunks):
+                return
+        missing = [chunk_id for chunk_id in self.chunks if chunk_id not in self._chunk_emb_rows]
+        Logger.log(f"Embedding {len(missing)} chunks for similarity matching...")
+        self._index_chunks(missing)
+    
+    def _get_chunk_index_path(self) -> str:
+        return os.path.join(self.cache_dir, f"{self.chunker_name}_chunk_index.npz")
+    
+    def _embedding_key(self) -> str:
+        """Model name plus backend and precision, so vectors from another variant of the model are not reused"""
+        return f"{self.embedding_model_name}|{embedding_variant(self.embedding_model)}"
+    
+    @staticmethod
+    def _chunk_fingerprint(chunk: AgenticChunk) -> str:
+        return hashlib.blake2b(f"{chunk.title}\n{chunk.summary}".encode(), digest_size=8).hexdigest()
+    
+    def _save_chunk_index(self):
+        """Persist the similarity matrix next to the chunk cache so the next run does not rebuild it"""
+        if self.embedding_model is None or not self._chunk_emb_ids:
+            return
+        try:
+            buffer = io.BytesIO()
+            np.savez(
+                buffer,
+                model=np.array(self._embedding_key()),
+                ids=np.array(self._chunk_emb_ids),
+                # Rows whose chunk changed title/summary since the save are re-embedded on load
+                fingerprints=np.array([self._chunk_fingerprint(self.chunks[chunk_id]) if chunk_id in self.chunks else ""
+                                       for chunk_id in self._chunk_emb_ids]),
+                vectors=self._chunk_embs[:len(self._chunk_emb_ids)]
+            )
+            self._atomic_write(self._get_chunk_index_path(), buffer.getvalue())
+        except Exception as e:
+            Logger.log(f"Failed to save chunk index: {e}")
+    
+    def _load_chunk_index(self):
+        """Restore rows saved by _save_chunk_index that still match the current chunks"""
+        index_path = self._get_chunk_index_path()
+        if not os.path.exists(index_path):
+            return
+        try:
+            with np.load(index_path) as saved:
+                if str(saved["model"]) != self._embedding_key():
+                    return
+                ids = saved["ids"].tolist()
+                fingerprints = saved["fingerprints"].tolist()
+                keep = [row for row, (chunk_id, fingerprint) in enumerate(zip(ids, fingerprints))
+                        if chunk_id in self.chunks and self._chunk_fingerprint(self.chunks[chunk_id]) == fingerprint]
+                if not keep:
+                    return
+                vectors = saved["vectors"][keep]
+            
+            # Reserved while no rows are counted yet, with room for the chunks still to be embedded
+            self._chunk_emb_ids = []
+            self._reserve_chunk_rows(len(self.chunks), vectors.shape[1])
+            self._chunk_emb_ids = [ids[row] for row in keep]
+            self._chunk_emb_rows = {chunk_id: row for row, chunk_id in enumerate(self._chunk_emb_ids)}
+            self._chunk_embs[:len(keep)] = vectors
+            Logger.log(f"Loaded {len(keep)} chunk embeddings from {index_path}")
+        except Exception as e:
+            Logger.log(f"Failed to load chunk index, rebuilding: {e}")
+            self._chunk_emb_ids = []
+            self._chunk_emb_rows = {}
+            self._chunk_embs = None
+    
+    def _save_consolidated_cache(self):
+        super()._save_consolidated_cache()
+        self._save_chunk_index()
+    
+    def _find_similar_chunk(self, proposition: str):
+        candidate_ids = None
+        if self.embedding_model is not None:
+            self._sync_chunk_index()
+            query = self._embed_texts([proposition])[0]
+            scores = self._chunk_embs[:len(self._chunk_emb_ids)] @ query
+            best = int(np.argmax(scores))
+            best_score = float(scores[best])
+            
+            if best_score >= self.match_threshold:
+                Logger.debug("Matched chunk %s by similarity (%.3f)", self._chunk_emb_ids[best], best_score)
+                return self._chunk_emb_ids[best]
+            if best_score < self.new_chunk_threshold:
+                Logger.debug("No similar chunk (best similarity %.3f), will create new chunk", best_score)
+                return None
+            
+            # Ambiguous: let the LLM decide, but only among the closest candidates
+            k = min(self.candidate_limit, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            candidate_ids = [self._chunk_emb_ids[row] for row in top]
+        
+        chunks = self.get_chunks(candidate_ids)
         
-        chunk_found = self.llm.answer(PROMPT, {
+        chunk_found = self._answer("find_similar_chunk", _FIND_SIMILAR_CHUNK_PROMPT, {
             "proposition": proposition,
             "current_chunk_outline": chunks
         })
         
-        Logger.log(f"Chunk found response: {chunk_found[:200] if len(chunk_found) > 200 else chunk_found}")
+        Logger.debug("Chunk found response: %.200s", chunk_found)
         
-        class ChunkMatch(BaseModel):
-            chunk_id: Optional[str] = None
-            
-        chunk_found = utils.parse_json_response(chunk_found, ChunkMatch)
+        chunk_found = utils.parse_json_response(chunk_found, _ChunkMatch)
         
-        if chunk_found is None or chunk_found.chunk_id not in self.chunks:
-            Logger.log(f"No matching chunk found, will create new chunk")
+        chunk_id = self._resolve_chunk_alias(chunk_found.chunk_id) if chunk_found is not None else None
+        if chunk_id is None:
+            Logger.debug("No matching chunk found, will create new chunk")
             return None
-        return chunk_found.chunk_id
+        if candidate_ids is not None and chunk_id not in candidate_ids:
+            Logger.debug("LLM picked a chunk outside the candidates, will create new chunk")
+            return None
+        return chunk_id
+    
+    def _resolve_chunk_alias(self, alias: Optional[str]) -> Optional[str]:
+        """Map the short id the LLM saw in the outline back to the chunk's UUID"""
+        if alias is None:
+            return None
+        alias = alias.strip()
+        if alias in self.chunks:
+            return alias
+        return self._alias_to_id.get(alias)
     
     def add_proposition_to_chunk(self, chunk_id: str, proposition: str):
         chunk = self.chunks[chunk_id] # Mengambil objek AgenticChunk
         
         # MEMANIPULASI OBJEK AgenticChunk
         chunk.propositions.append(proposition)
+        self._proposition_owner.setdefault(proposition, chunk_id)
+        if self.current_doc_updated_ids is not None:
+            self.current_doc_updated_ids.append(chunk_id)
+        
+        # Title/summary are refreshed once per page in _refresh_dirty_chunks instead of per proposition
+        self._dirty_chunks[chunk_id] = None
+    
+    def _refresh_dirty_chunks(self) -> List[str]:
+        """Regenerate title and summary of chunks that received propositions since the last refresh"""
+        if not self._dirty_chunks:
+            return []
+        
+        dirty_ids = list(self._dirty_chunks)
+        chunks = [self.chunks[chunk_id] for chunk_id in dirty_ids]
         
-        # MENGUPDATE properti objek AgenticChunk
-        chunk.title = self._update_chunk_title(chunk)
-        chunk.summary = self._update_chunk_summary(chunk)
+        # One independent LLM call per chunk, so run them side by side
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(chunks))) as executor:
+            updates = list(executor.map(self._update_chunk_title_summary, chunks))
+        # Only drop them once every call succeeded, so a failed refresh is retried on the next one
+        for chunk_id in dirty_ids:
+            self._dirty_chunks.pop(chunk_id, None)
+        
+        changed_ids = []
+        for chunk, (title, summary) in zip(chunks, updates):
+            # MENGUPDATE properti objek AgenticChunk
+            if title != chunk.title or summary != chunk.summary:
+                chunk.title = title
+                chunk.summary = summary
+                changed_ids.append(chunk.id)
+        
+        for chunk_id in changed_ids:
+            self._chunk_line_cache.pop(chunk_id, None)
+        if changed_ids:
+            self._outline_dirty = True
+            self._index_chunks(changed_ids)
+        return dirty_ids
         
     def add_proposition(self, proposition: str, page: Document):
-        Logger.log(f"Adding proposition to chunker: {proposition}")
+        Logger.debug("Adding proposition to chunker: %s", proposition)
+        
+        # Legal texts repeat standard propositions verbatim; a stored copy already covers it
+        if proposition in self._proposition_owner:
+            Logger.debug("Proposition already stored in chunk %s, skipping", self._proposition_owner[proposition])
+            return
+        if len(proposition) < 128:
+            proposition = sys.intern(proposition)
         
         if len(self.chunks) == 0:
             self._create_chunk(proposition, page)
@@ -440,6 +937,9 @@ class AgenticChunker(BaseChunker):
     def _get_chunk_type(self) -> str:
         return 'agentic'
     
+    def _get_chunk_class(self) -> type:
+        return AgenticChunk
+    
     def _reconstruct_chunk(self, chunk_dict: dict, chunk_type: str) -> AgenticChunk:
         """Reconstruct AgenticChunk object from dict"""
         return AgenticChunk(**chunk_dict)
\ No newline at end of file
@@ -6,12 +6,63 @@ from pydantic import BaseModel
 from typing import Optional, List, Dict
 from langchain_core.documents import Document
 import os
+from bisect import bisect_right
 
 from llm.base import BaseLLM
 from .base import BaseChunker
 from model.chunk.simple_chunk import SimpleChunk
 
 
+# Built once at import, the prompt is the same for every document
+_DOCUMENT_CHUNKING_SYSTEM_PROMPT = """
+Anda adalah asisten AI yang sangat teliti yang bertugas melakukan chunking dokumen hukum Indonesia (UU, PP, Perpres, Permen, Perda, dan dokumen hukum lainnya) dengan menjaga struktur asli secara utuh tanpa modifikasi apa pun.
+
+PRINSIP MUTLAK:
+1. JANGAN menghapus, mengubah, menambah, memperbaiki, atau menafsirkan teks dalam bentuk apa pun.
+2. JANGAN memperbaiki struktur, format, kesalahan ketik, tanda baca, atau penomoran.
+3. Pertahankan seluruh format asli seperti "BAB I", "Bagian Kedua", "Pasal 12", "Ayat (3)", termasuk seluruh baris, spasi, dan jeda.
+4. Output harus dapat digunakan untuk merekonstruksi bagian asli dari dokumen tanpa kehilangan konteks.
+
+TUJUAN CHUNKING:
+- Setiap chunk mewakili satu unit makna utuh.
+- Usahakan 1 chunk = 1 PASAL lengkap (termasuk semua ayat di bawahnya).
+- Jika satu pasal sangat panjang dan memiliki subtopik yang jelas, Anda boleh memecahnya menjadi 2–3 chunk besar.
+- JANGAN memotong per kalimat.
+- JANGAN pernah menggabungkan dua pasal berbeda dalam satu chunk.
+- Sertakan BAB / Bagian / Paragraf yang berada di atas pasal tersebut jika muncul dalam teks.
+
+PEDOMAN KHUSUS:
+1. Gunakan struktur hukum sebagai dasar pembagian: BAB → Bagian → Paragraf → Pasal → Ayat.
+2. Jika BAB/BAGIAN/PARAGRAF muncul tepat sebelum pasal, satukan ke dalam chunk pasal tersebut.
+3. Setiap chunk harus utuh secara makna dan mengandung konteks yang cukup.
+4. Panjang chunk ideal: 300–1500 karakter (panduan fleksibel, bukan batas keras).
+5. Jika teks rusak, tidak lengkap, tidak rapi, memiliki format kacau, atau hilang sebagian:
+   - JANGAN memperbaiki.
+   - JANGAN menebak.
+   - JANGAN mengisi bagian yang hilang.
+   - Cukup lakukan chunking berdasarkan potongan teks yang ada secara apa adanya.
+
+KEBERSIHAN OUTPUT:
+- Setiap chunk dipisahkan dengan string: ---SPLIT---
+- HANYA keluarkan isi chunk; tidak boleh ada penjelasan, komentar, heading tambahan, reasoning, atau catatan apa pun.
+- Jangan menambahkan nomor chunk.
+- Jangan menambahkan penutup atau pembuka.
+
+FORMAT OUTPUT (WAJIB):
+<isi chunk 1 apa adanya>
+---SPLIT---
+<isi chunk 2 apa adanya>
+---SPLIT---
+<isi chunk 3 apa adanya>
+(dan seterusnya)
+        """
+
+_DOCUMENT_CHUNKING_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", _DOCUMENT_CHUNKING_SYSTEM_PROMPT),
+    ("user", "Chunk dokumen hukum berikut menjadi bagian semantik:\n\n{text}")
+])
+
+
 class AgenticChunkerV2(BaseChunker):
     """
     Option B: Document-level agentic chunking.
@@ -81,11 +132,16 @@ class AgenticChunkerV2(BaseChunker):
             # Map chunks → metadata + page number
             Logger.log(f"  - Mapping chunks to page numbers...")
             chunks_created = 0
+            page_starts = [page["start"] for page in page_ranges]
+            search_from = 0
             for chunk_text in chunks_text:
-                self._create_chunk_with_page_mapping(
+                search_from = self._create_chunk_with_page_mapping(
                     chunk_text,
                     source,
-                    page_ranges
+                    page_ranges,
+                    full_text,
+                    page_starts,
+                    search_from
                 )
                 chunks_created += 1
             
@@ -120,7 +176,7 @@ class AgenticChunkerV2(BaseChunker):
         """
         pages = sorted(pages, key=lambda p: p.metadata.get("page", 0))
 
-        full_text = ""
+        parts = []
         page_ranges = []
 
         cursor = 0
@@ -135,9 +191,11 @@ class AgenticChunkerV2(BaseChunker):
                 "end": end
             })
 
-            full_text += txt + "\n"
+            parts.append(txt)
             cursor = end + 1
 
+        # One join instead of re-copying the growing document for every page
+        full_text = "\n".join(parts) + "\n" if parts else ""
         return full_text, page_ranges
 
     # -------------------------------------------------------------------------
@@ -145,55 +203,8 @@ class AgenticChunkerV2(BaseChunker):
     # -------------------------------------------------------------------------
     def _agentic_chunk_document(self, text: str) -> List[str]:
 
-        system_prompt = """
-Anda adalah asisten AI yang sangat teliti yang bertugas melakukan chunking dokumen hukum Indonesia (UU, PP, Perpres, Permen, Perda, dan dokumen hukum lainnya) dengan menjaga struktur asli secara utuh tanpa modifikasi apa pun.
 
-PRINSIP MUTLAK:
-1. JANGAN menghapus, mengubah, menambah, memperbaiki, atau menafsirkan teks dalam bentuk apa pun.
-2. JANGAN memperbaiki struktur, format, kesalahan ketik, tanda baca, atau penomoran.
-3. Pertahankan seluruh format asli seperti "BAB I", "Bagian Kedua", "Pasal 12", "Ayat (3)", termasuk seluruh baris, spasi, dan jeda.
-4. Output harus dapat digunakan untuk merekonstruksi bagian asli dari dokumen tanpa kehilangan konteks.
-
-TUJUAN CHUNKING:
-- Setiap chunk mewakili satu unit makna utuh.
-- Usahakan 1 chunk = 1 PASAL lengkap (termasuk semua ayat di bawahnya).
-- Jika satu pasal sangat panjang dan memiliki subtopik yang jelas, Anda boleh memecahnya menjadi 2–3 chunk besar.
-- JANGAN memotong per kalimat.
-- JANGAN pernah menggabungkan dua pasal berbeda dalam satu chunk.
-- Sertakan BAB / Bagian / Paragraf yang berada di atas pasal tersebut jika muncul dalam teks.
-
-PEDOMAN KHUSUS:
-1. Gunakan struktur hukum sebagai dasar pembagian: BAB → Bagian → Paragraf → Pasal → Ayat.
-2. Jika BAB/BAGIAN/PARAGRAF muncul tepat sebelum pasal, satukan ke dalam chunk pasal tersebut.
-3. Setiap chunk harus utuh secara makna dan mengandung konteks yang cukup.
-4. Panjang chunk ideal: 300–1500 karakter (panduan fleksibel, bukan batas keras).
-5. Jika teks rusak, tidak lengkap, tidak rapi, memiliki format kacau, atau hilang sebagian:
-   - JANGAN memperbaiki.
-   - JANGAN menebak.
-   - JANGAN mengisi bagian yang hilang.
-   - Cukup lakukan chunking berdasarkan potongan teks yang ada secara apa adanya.
-
-KEBERSIHAN OUTPUT:
-- Setiap chunk dipisahkan dengan string: ---SPLIT---
-- HANYA keluarkan isi chunk; tidak boleh ada penjelasan, komentar, heading tambahan, reasoning, atau catatan apa pun.
-- Jangan menambahkan nomor chunk.
-- Jangan menambahkan penutup atau pembuka.
-
-FORMAT OUTPUT (WAJIB):
-<isi chunk 1 apa adanya>
----SPLIT---
-<isi chunk 2 apa adanya>
----SPLIT---
-<isi chunk 3 apa adanya>
-(dan seterusnya)
-        """
-
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", system_prompt),
-            ("user", "Chunk dokumen hukum berikut menjadi bagian semantik:\n\n{text}")
-        ])
-
-        response = self.llm.answer(prompt, {"text": text})
+        response = self.llm.answer(_DOCUMENT_CHUNKING_PROMPT, {"text": text})
 
         chunks = [c.strip() for c in response.split("---SPLIT---") if c.strip()]
         Logger.log(f"Generated {len(chunks)} chunks")
@@ -203,22 +214,26 @@ FORMAT OUTPUT (WAJIB):
     # -------------------------------------------------------------------------
     # MAP CHUNK BACK TO PAGE RANGE
     # -------------------------------------------------------------------------
-    def _create_chunk_with_page_mapping(self, chunk_text: str, source: str, page_ranges: list):
+    def _create_chunk_with_page_mapping(self, chunk_text: str, source: str, page_ranges: list,
+                                        full_text: str, page_starts: List[int], search_from: int = 0) -> int:
         """
         Estimate page number of chunk by matching its first occurrence in the full text.
+        Returns the offset to continue searching from for the next (later) chunk.
         """
         # Find page by approximate position
         first_line = chunk_text[:50]  # first part of chunk
-        possible_pages = []
 
-        # Very simple but effective fuzzy page locating
-        for page in page_ranges:
-            # if any substring intersection exists, mark candidate
-            if first_line in page.get("full_page_text", ""):
-                possible_pages.append(page["page"])
+        # Chunks come back in document order, so resume the scan where the previous one matched
+        position = full_text.find(first_line, search_from)
+        if position == -1:
+            position = full_text.find(first_line)
 
-        # Fallback: choose earliest possible page by length heuristics
-        page_num = possible_pages[0] if possible_pages else page_ranges[0]["page"]
+        if position == -1:
+            # Fallback: LLM altered the text, keep the page of the previous match
+            page_num = page_ranges[max(bisect_right(page_starts, search_from) - 1, 0)]["page"]
+        else:
+            page_num = page_ranges[max(bisect_right(page_starts, position) - 1, 0)]["page"]
+            search_from = position
 
         # Create chunk
         chunk_id = str(uuid.uuid4())
@@ -232,10 +247,14 @@ FORMAT OUTPUT (WAJIB):
         )
 
         self.chunks[chunk_id] = new_chunk
+        return search_from
 
     # -------------------------------------------------------------------------
     def _get_chunk_type(self) -> str:
         return "agentic_v2"
 
+    def _get_chunk_class(self) -> type:
+        return SimpleChunk
+
     def _reconstruct_chunk(self, chunk_dict: dict, chunk_type: str) -> SimpleChunk:
         return SimpleChunk(**chunk_dict)
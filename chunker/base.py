@@ -1,56 +1,176 @@
 from langchain_core.documents import Document
 from model import BaseChunk
-from typing import Dict, List, Set
+from pydantic import BaseModel
+from typing import Dict, Generic, List, Optional, Set, Tuple, Type, TypeVar
 import hashlib
-import json
+import orjson
 import os
+import sqlite3
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+HASH_BLOCK_SIZE = 64 * 1024
+PARALLEL_HASH_MIN_PAGES = 256
+
+ChunkT = TypeVar("ChunkT", bound=BaseChunk)
+
+
+class _ConsolidatedCache(BaseModel, Generic[ChunkT]):
+    """Parts of a consolidated cache file needed to restore a chunker"""
+    processed_docs: List[str] = []
+    chunks: List[ChunkT] = []
+
+
 class BaseChunker:
     def __init__(self, cache_dir: str = "./chunk_cache", chunker_name: str = "base"):
         self.chunks : Dict[str, BaseChunk] = {}
         self.cache_dir = cache_dir
         self.chunker_name = chunker_name
         self.processed_doc_hashes: Set[str] = set()  # Track processed documents
+        self._journal: Optional[sqlite3.Connection] = None  # Lazily opened log of per-document progress
+        self._cache_loaded = False  # Set once the on-disk cache has been read into memory
+        self._doc_hash_memo: Dict[int, Tuple[Document, str]] = {}  # id(page) -> (page, hash) of pages awaiting processing
         os.makedirs(cache_dir, exist_ok=True)
     
     def _get_document_hash(self, page: Document) -> str:
         """Generate unique hash for a document based on its content and metadata"""
-        content = page.page_content
+        content = page.page_content.encode()
         source = page.metadata.get("source", "")
         page_num = page.metadata.get("page", 0)
-        hash_input = f"{source}:{page_num}:{content}"
-        return hashlib.sha256(hash_input.encode()).hexdigest()
+        
+        # Same digest as hashing f"{source}:{page_num}:{content}", fed incrementally so the
+        # page is not copied into a concatenated string first. The hash is only a cache key.
+        hasher = hashlib.sha256(f"{source}:{page_num}:".encode(), usedforsecurity=False)
+        view = memoryview(content)
+        for offset in range(0, len(view), HASH_BLOCK_SIZE):
+            hasher.update(view[offset:offset + HASH_BLOCK_SIZE])
+        return hasher.hexdigest()
     
     def _get_consolidated_cache_path(self) -> str:
         """Get path for consolidated cache file"""
         return os.path.join(self.cache_dir, f"{self.chunker_name}_cache.json")
     
+    def _get_journal_path(self) -> str:
+        """Get path for the SQLite journal that sits on top of the consolidated cache"""
+        return os.path.join(self.cache_dir, f"{self.chunker_name}_cache.sqlite")
+    
+    def _open_journal(self) -> sqlite3.Connection:
+        if self._journal is None:
+            # Chunking may run in a worker thread (RAGPipeline.ingest_documents); access stays sequential
+            self._journal = sqlite3.connect(self._get_journal_path(), check_same_thread=False)
+            self._journal.execute("PRAGMA journal_mode=WAL")
+            self._journal.execute("PRAGMA synchronous=NORMAL")
+            self._journal.execute("CREATE TABLE IF NOT EXISTS chunks (id TEXT PRIMARY KEY, payload BLOB NOT NULL)")
+            self._journal.execute("CREATE TABLE IF NOT EXISTS processed_docs (doc_hash TEXT PRIMARY KEY)")
+        return self._journal
+    
+    def _append_to_journal(self, doc_hash: Optional[str], chunk_ids: List[str]):
+        """Record the chunks created or changed by one document (or by no document when None) in the journal"""
+        journal = self._open_journal()
+        # Rows hold the latest state of each chunk, so a chunk updated by many documents is stored once.
+        # An upsert keeps the rowid of the first write, which records the order chunks were created in.
+        journal.executemany(
+            "INSERT INTO chunks (id, payload) VALUES (?, ?) ON CONFLICT(id) DO UPDATE SET payload = excluded.payload",
+            [(chunk_id, orjson.dumps(self.chunks[chunk_id].model_dump())) for chunk_id in chunk_ids if chunk_id in self.chunks]
+        )
+        if doc_hash:
+            journal.execute("INSERT OR IGNORE INTO processed_docs (doc_hash) VALUES (?)", (doc_hash,))
+    
+    def _flush_journal(self):
+        """Commit the journal writes made since the last flush"""
+        if self._journal is not None:
+            self._journal.commit()
+    
+    def _close_journal(self):
+        if self._journal is not None:
+            self._journal.commit()
+            self._journal.close()
+            self._journal = None
+    
+    def _replay_journal(self) -> bool:
+        """Apply journal rows committed since the last compaction"""
+        if not os.path.exists(self._get_journal_path()):
+            return False
+        
+        journal = self._open_journal()
+        chunk_class = self._get_chunk_class()
+        chunk_type = self._get_chunk_type()
+        replayed = 0
+        for (payload,) in journal.execute("SELECT payload FROM chunks ORDER BY rowid"):
+            if chunk_class is not None:
+                chunk = chunk_class.model_validate_json(payload)
+            else:
+                chunk = self._reconstruct_chunk(orjson.loads(payload), chunk_type)
+            if chunk:
+                self.chunks[chunk.id] = chunk
+                replayed += 1
+        
+        for (doc_hash,) in journal.execute("SELECT doc_hash FROM processed_docs"):
+            self.processed_doc_hashes.add(doc_hash)
+            replayed += 1
+        
+        return replayed > 0
+    
+    def _clear_journal(self):
+        """Drop journal rows once they are part of the consolidated file"""
+        if self._journal is None and not os.path.exists(self._get_journal_path()):
+            return
+        journal = self._open_journal()
+        journal.execute("DELETE FROM chunks")
+        journal.execute("DELETE FROM processed_docs")
+        # Reopened lazily by the next write, so the connection and its WAL do not stay open meanwhile
+        self._close_journal()
+    
     def _load_consolidated_cache(self) -> bool:
-        """Load all chunks from consolidated cache file"""
+        """Load all chunks from consolidated cache file, then replay the journal tail"""
+        if self._cache_loaded:
+            # Everything on disk is already in memory (and in-memory state is newer)
+            return bool(self.chunks or self.processed_doc_hashes)
+        
+        loaded = self._load_consolidated_file()
+        try:
+            replayed = self._replay_journal()
+        except Exception as e:
+            print(f"Failed to replay cache journal: {e}")
+            replayed = False
+        self._cache_loaded = True
+        return loaded or replayed
+    
+    def _load_consolidated_file(self) -> bool:
         cache_path = self._get_consolidated_cache_path()
         if os.path.exists(cache_path):
             try:
-                with open(cache_path, 'r', encoding='utf-8') as f:
-                    cached_data = json.load(f)
-                    
-                    chunks_data = cached_data.get('chunks', [])
-                    self.processed_doc_hashes = set(cached_data.get('processed_docs', []))
-                    chunk_type = cached_data.get('chunk_type', 'base')
-                    
-                    # Reconstruct chunk objects from JSON
-                    for chunk_dict in chunks_data:
-                        chunk = self._reconstruct_chunk(chunk_dict, chunk_type)
-                        if chunk:
-                            self.chunks[chunk.id] = chunk
-                    
+                with open(cache_path, 'rb') as f:
+                    raw = f.read()
+                
+                chunk_class = self._get_chunk_class()
+                if chunk_class is not None:
+                    # Parse and validate straight into chunk models in a single pass
+                    cached = _ConsolidatedCache[chunk_class].model_validate_json(raw)
+                    self.processed_doc_hashes = set(cached.processed_docs)
+                    for chunk in cached.chunks:
+                        self.chunks[chunk.id] = chunk
                     return True
+                
+                cached_data = orjson.loads(raw)
+                chunks_data = cached_data.get('chunks', [])
+                self.processed_doc_hashes = set(cached_data.get('processed_docs', []))
+                chunk_type = cached_data.get('chunk_type', 'base')
+                
+                # Reconstruct chunk objects from JSON
+                for chunk_dict in chunks_data:
+                    chunk = self._reconstruct_chunk(chunk_dict, chunk_type)
+                    if chunk:
+                        self.chunks[chunk.id] = chunk
+                
+                return True
             except Exception as e:
                 print(f"Failed to load cache: {e}")
         return False
     
     def _save_consolidated_cache(self):
-        """Save all chunks to consolidated cache file"""
+        """Save all chunks to consolidated cache file and truncate the journal it supersedes"""
         from logger import Logger
         cache_path = self._get_consolidated_cache_path()
         
@@ -68,45 +188,96 @@ class BaseChunker:
                 'chunks': chunks_data
             }
             
-            with open(cache_path, 'w', encoding='utf-8') as f:
-                json.dump(cache_data, f, ensure_ascii=False, indent=2)
+            # Compact output: the cache is read by programs, indentation only inflated it
+            self._atomic_write(cache_path, orjson.dumps(cache_data))
+            
+            # Everything in the journal is now part of the consolidated file
+            self._clear_journal()
             
             Logger.log(f"✓ Saved {len(chunks_data)} chunks to {cache_path}")
         except Exception as e:
             Logger.log(f"Failed to save cache: {e}")
     
+    def _atomic_write(self, path: str, data: bytes):
+        """Write to a temp file next to `path` and swap it in, so readers never see a partial cache"""
+        tmp = tempfile.NamedTemporaryFile(dir=os.path.dirname(path) or ".", prefix=".", suffix=".tmp", delete=False)
+        try:
+            with tmp:
+                tmp.write(data)
+            os.replace(tmp.name, path)
+        except BaseException:
+            if os.path.exists(tmp.name):
+                os.remove(tmp.name)
+            raise
+    
     def _get_chunk_type(self) -> str:
         """Get the chunk type for this chunker (to be overridden by subclasses)"""
         return 'base'
     
+    def _get_chunk_class(self) -> Optional[Type[BaseChunk]]:
+        """Get the chunk model stored by this chunker, enables single-pass cache loading (to be overridden by subclasses)"""
+        return None
+    
     def _reconstruct_chunk(self, chunk_dict: dict, chunk_type: str) -> BaseChunk:
         """Reconstruct a single chunk object from dict (to be overridden by subclasses)"""
         return None
     
+    def _get_pages_to_process(self, pages: List[Document], use_cache: bool = True) -> List[Document]:
+        """Load the cache (if enabled) and return only the pages that still need chunking"""
+        from logger import Logger
+        if use_cache:
+            self._load_consolidated_cache()
+            if len(self.chunks) > 0:
+                Logger.log(f"Loaded {len(self.chunks)} chunks from cache")
+        
+        uncached_pages = self.get_uncached_documents(pages)
+        if len(uncached_pages) < len(pages):
+            Logger.log(f"Skipping {len(pages) - len(uncached_pages)} already processed documents")
+        if not uncached_pages:
+            Logger.log("All documents already processed")
+        return uncached_pages
+    
     def get_uncached_documents(self, pages: List[Document]) -> List[Document]:
         """Filter out documents that are already processed"""
+        if not self.processed_doc_hashes:
+            # Nothing cached yet, no need to hash every page
+            return list(pages)
+        
+        doc_hashes = self._hash_documents(pages)
         uncached = []
-        for page in pages:
-            doc_hash = self._get_document_hash(page)
+        for page, doc_hash in zip(pages, doc_hashes):
             if doc_hash not in self.processed_doc_hashes:
+                # Kept until mark_document_processed so the page is not hashed a second time
+                self._doc_hash_memo[id(page)] = (page, doc_hash)
                 uncached.append(page)
         return uncached
     
-    def mark_document_processed(self, page: Document):
-        """Mark a document as processed"""
-        doc_hash = self._get_document_hash(page)
+    def _hash_documents(self, pages: List[Document]) -> List[str]:
+        """Hash many pages at once; hashlib releases the GIL on large buffers, so threads scale"""
+        if len(pages) < PARALLEL_HASH_MIN_PAGES:
+            return [self._get_document_hash(page) for page in pages]
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            return list(executor.map(self._get_document_hash, pages))
+    
+    def mark_document_processed(self, page: Document) -> str:
+        """Mark a document as processed and return its hash"""
+        memo = self._doc_hash_memo.pop(id(page), None)
+        # The page reference in the memo makes sure the id was not reused by another object
+        doc_hash = memo[1] if memo is not None and memo[0] is page else self._get_document_hash(page)
         self.processed_doc_hashes.add(doc_hash)
+        return doc_hash
     
     def is_document_processed_by_source(self, source: str) -> bool:
         """Check if a document source has been processed (for document-level chunking)"""
         # For document-level chunking, we use the source as the hash
-        source_hash = hashlib.sha256(source.encode()).hexdigest()
-        return source_hash in self.processed_doc_hashes
+        return self._get_source_hash(source) in self.processed_doc_hashes
     
     def mark_document_processed_by_source(self, source: str):
         """Mark a document source as processed (for document-level chunking)"""
-        source_hash = hashlib.sha256(source.encode()).hexdigest()
-        self.processed_doc_hashes.add(source_hash)
+        self.processed_doc_hashes.add(self._get_source_hash(source))
+    
+    def _get_source_hash(self, source: str) -> str:
+        return hashlib.sha256(source.encode(), usedforsecurity=False).hexdigest()
     
     def get_chunks_for_database(self) -> List[BaseChunk]:
         """Get all chunks ready for database storage"""
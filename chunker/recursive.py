@@ -1,6 +1,7 @@
 from langchain_core.documents import Document
 from langchain_text_splitters  import RecursiveCharacterTextSplitter
 from .base import BaseChunker
+import sys
 import uuid
 from model.chunk.recursive_chunk import RecursiveChunk
 from typing import Dict, List
@@ -15,19 +16,9 @@ class RecursiveChunker(BaseChunker):
         )
 
     def load_data_to_chunks(self, pages: list[Document], use_cache: bool = True):
-        # Load existing cache
-        if use_cache:
-            self._load_consolidated_cache()
-            if len(self.chunks) > 0:
-                Logger.log(f"Loaded {len(self.chunks)} chunks from cache")
-        
-        # Filter uncached documents
-        uncached_pages = self.get_uncached_documents(pages)
-        if len(uncached_pages) < len(pages):
-            Logger.log(f"Skipping {len(pages) - len(uncached_pages)} already processed documents")
-        
+        # Load existing cache and keep only documents that still need chunking
+        uncached_pages = self._get_pages_to_process(pages, use_cache)
         if not uncached_pages:
-            Logger.log("All documents already processed")
             return
         
         Logger.log(f"Processing {len(uncached_pages)} new documents with recursive chunking...")
@@ -40,20 +31,26 @@ class RecursiveChunker(BaseChunker):
             for idx, page in enumerate(uncached_pages, 1):
                 try:
                     
-                    # Split this specific page
-                    split_docs = self.text_splitter.split_documents([page])
+                    # Split this specific page; every piece carries the page's metadata, so read it
+                    # once and share interned strings instead of a metadata copy per chunk
+                    metadata = page.metadata or {}
+                    source = metadata.get("source")
+                    page_label = metadata.get("page_label")
+                    if isinstance(source, str):
+                        source = sys.intern(source)
+                    if isinstance(page_label, str):
+                        page_label = sys.intern(page_label)
                     
-                    for doc in split_docs:
+                    for text in self.text_splitter.split_text(page.page_content):
                         id = str(uuid.uuid4())
-                        metadata = doc.metadata or {}
 
                         chunk_obj = RecursiveChunk(
                             id=id,
-                            content=doc.page_content,
-                            source=metadata.get("source"),
+                            content=text,
+                            source=source,
                             page=metadata.get("page"),
                             total_pages=metadata.get("total_pages"),
-                            page_label=metadata.get("page_label"),
+                            page_label=page_label,
                         )
 
                         self.chunks[id] = chunk_obj
@@ -79,6 +76,9 @@ class RecursiveChunker(BaseChunker):
             self._save_consolidated_cache()
             Logger.log(f"Progress saved: {processed_count}/{len(uncached_pages)} documents processed")
             raise
+        finally:
+            # Pages that failed keep no hash memo entry (and no page reference) past this call
+            self._doc_hash_memo.clear()
         
         Logger.log(f"Total chunks: {len(self.chunks)} (added {processed_count} documents)")
         
@@ -89,6 +89,9 @@ class RecursiveChunker(BaseChunker):
     def _get_chunk_type(self) -> str:
         return 'recursive'
     
+    def _get_chunk_class(self) -> type:
+        return RecursiveChunk
+    
     def _reconstruct_chunk(self, chunk_dict: dict, chunk_type: str) -> RecursiveChunk:
         """Reconstruct RecursiveChunk object from dict"""
         return RecursiveChunk(**chunk_dict)
\ No newline at end of file
@@ -1,37 +1,84 @@
 from langchain_core.documents import Document
 from langchain_experimental.text_splitter import SemanticChunker as LangChainSemanticChunker
+import torch
 from sentence_transformers import SentenceTransformer
 from .base import BaseChunker
-import uuid
 from model.chunk.semantic_chunk import SemanticChunk
-from typing import Dict, List
+from utils.embedding_cache import EmbeddingCache
+from utils.model_registry import get_sentence_transformer, encode_adaptive, embedding_variant
+from typing import Dict, List, Optional
 from logger import Logger
+import numpy as np
+import os
 import re
 
+# uuid4 variant nibble (10xx) for each random hex digit
+_UUID_VARIANT = {digit: "89ab"[int(digit, 16) & 3] for digit in "0123456789abcdef"}
+
+
+def _bulk_uuid4(n: int) -> List[str]:
+    """n random version-4 UUID strings from a single os.urandom call, without building UUID objects"""
+    raw = os.urandom(16 * n).hex()
+    ids = []
+    for start in range(0, 32 * n, 32):
+        h = raw[start:start + 32]
+        ids.append(f"{h[:8]}-{h[8:12]}-4{h[13:16]}-{_UUID_VARIANT[h[16]]}{h[17:20]}-{h[20:]}")
+    return ids
+
+
 class SemanticChunker(BaseChunker):
     def __init__(self, 
                  embedding_model_name: str = "LazarusNLP/all-indo-e5-small-v4",
                  breakpoint_threshold_type: str = "percentile",
                  breakpoint_threshold_amount: float = 95.0,
                  number_of_chunks: int = None,
-                 cache_dir: str = "./chunk_cache"):
+                 cache_dir: str = "./chunk_cache",
+                 encode_batch_size: int = 256,
+                 half_precision: bool = True,
+                 compile_model: bool = False,
+                 encode_devices: Optional[List[str]] = None,
+                 backend: str = "torch",
+                 embedding_model: Optional[SentenceTransformer] = None):
         super().__init__(cache_dir=cache_dir, chunker_name="semantic")
         
-        Logger.log(f"Loading embedding model: {embedding_model_name}")
-        self.embedding_model = SentenceTransformer(embedding_model_name)
+        if embedding_model is not None:
+            # An already loaded model (e.g. the vector store's), embedding_model_name only labels it
+            self.embedding_model = embedding_model
+        else:
+            Logger.log(f"Loading embedding model: {embedding_model_name}")
+            # backend="onnx" / "openvino" runs the exported graph instead of PyTorch, "onnx-int8" its int8 quantization
+            self.embedding_model = get_sentence_transformer(embedding_model_name, backend=backend, half_precision=half_precision)
         self.embedding_model_name = embedding_model_name
+        if backend == "torch":
+            self._optimize_embedding_model(compile_model)
+        self.encode_batch_size = encode_batch_size
+        # e.g. ["cuda:0", "cuda:1"] or ["cpu"] * 4: one encoder process per entry
+        self.encode_devices = encode_devices
+        # Sentence windows seen in earlier runs (re-ingested PDFs) are not encoded again
+        self.embedding_cache = EmbeddingCache(
+            os.path.join(cache_dir, "embeddings.db"), f"{embedding_model_name}|{embedding_variant(self.embedding_model)}"
+        )
         
         class SentenceTransformerEmbeddings:
-            def __init__(self, model):
+            def __init__(self, model, batch_size):
                 self.model = model
+                self.batch_size = batch_size
             
+            # Rows of the (n, d) array are consumed directly by LangChain's
+            # cosine distance step, so skip the list-of-lists conversion
             def embed_documents(self, texts):
-                return self.model.encode(texts).tolist()
+                return self.model.encode(
+                    texts,
+                    batch_size=self.batch_size,
+                    convert_to_numpy=True,
+                    normalize_embeddings=True,
+                    show_progress_bar=False
+                )
             
             def embed_query(self, text):
-                return self.model.encode([text])[0].tolist()
+                return self.embed_documents([text])[0]
         
-        embeddings_wrapper = SentenceTransformerEmbeddings(self.embedding_model)
+        embeddings_wrapper = SentenceTransformerEmbeddings(self.embedding_model, self.encode_batch_size)
         
         self.text_splitter = LangChainSemanticChunker(
             embeddings=embeddings_wrapper,
@@ -46,6 +93,17 @@ class SemanticChunker(BaseChunker):
         self.min_chunk_chars = 20
         self.min_alnum_ratio = 0.15
 
+    def _optimize_embedding_model(self, compile_model: bool):
+        """Optionally compile the encoder's transformer (half precision is applied when the model is loaded)"""
+        if compile_model:
+            try:
+                # Compile the inner HF model only, SentenceTransformer.encode stays callable as is
+                transformer = self.embedding_model[0]
+                transformer.auto_model = torch.compile(transformer.auto_model, dynamic=True)
+                Logger.log("Embedding model compiled with torch.compile")
+            except Exception as e:
+                Logger.log(f"torch.compile unavailable, using eager model: {e}")
+
     def _is_meaningful_chunk(self, text: str) -> bool:
         """Check if chunk has meaningful content"""
         if not text or len(text) < self.min_chunk_chars:
@@ -60,28 +118,106 @@ class SemanticChunker(BaseChunker):
             return False
         return True
 
+    def _split_pages(self, pages: List[Document]) -> List[Document]:
+        """Same splits as text_splitter.split_documents, but with one encode call for all pages"""
+        splitter = self.text_splitter
+        page_sentences = []
+        combined = []
+        for page in pages:
+            sentences = splitter._get_single_sentences_list(page.page_content)
+            page_sentences.append(sentences)
+            if self._needs_breakpoints(sentences):
+                buffer = splitter.buffer_size
+                combined.extend(
+                    " ".join(sentences[max(0, i - buffer):i + buffer + 1]) for i in range(len(sentences))
+                )
+        
+        embeddings = self._encode_sentences(combined) if combined else None
+        
+        docs = []
+        offset = 0
+        for page, sentences in zip(pages, page_sentences):
+            if not self._needs_breakpoints(sentences):
+                texts = sentences
+            else:
+                page_embeddings = embeddings[offset:offset + len(sentences)]
+                offset += len(sentences)
+                texts = self._group_sentences(sentences, page_embeddings)
+            for text in texts:
+                docs.append(Document(page_content=text, metadata=dict(page.metadata)))
+        return docs
+    
+    def _encode_sentences(self, texts: List[str]) -> np.ndarray:
+        """Normalized embeddings of texts, encoding only those missing from the embedding cache"""
+        return self.embedding_cache.encode(texts, self._encode_uncached)
+    
+    def _encode_uncached(self, texts: List[str]) -> np.ndarray:
+        """Normalized embeddings of texts, spread over encode_devices when more than one is set"""
+        if self.encode_devices and len(self.encode_devices) > 1:
+            Logger.log(f"Encoding {len(texts)} sentence windows on {len(self.encode_devices)} devices...")
+            pool = self.embedding_model.start_multi_process_pool(target_devices=self.encode_devices)
+            try:
+                return self.embedding_model.encode_multi_process(
+                    texts,
+                    pool,
+                    batch_size=self.encode_batch_size,
+                    normalize_embeddings=True
+                )
+            finally:
+                self.embedding_model.stop_multi_process_pool(pool)
+        
+        return encode_adaptive(self.embedding_model, texts, self.encode_batch_size, normalize_embeddings=True)
+    
+    def _needs_breakpoints(self, sentences: List[str]) -> bool:
+        # Mirrors the early returns of LangChain's split_text (percentiles/gradients need enough points)
+        if len(sentences) == 1:
+            return False
+        return not (self.text_splitter.breakpoint_threshold_type == "gradient" and len(sentences) == 2)
+    
+    def _group_sentences(self, sentences: List[str], embeddings: np.ndarray) -> List[str]:
+        """Cut a page's sentences where the distance between neighbouring windows spikes"""
+        min_chunk_size = self.text_splitter.min_chunk_size
+        
+        chunks = []
+        start_index = 0
+        for index in self._semantic_split(embeddings).tolist():
+            combined_text = " ".join(sentences[start_index:index + 1])
+            # Small groups keep growing into the next one, as in LangChain
+            if min_chunk_size is not None and len(combined_text) < min_chunk_size:
+                continue
+            chunks.append(combined_text)
+            start_index = index + 1
+        
+        if start_index < len(sentences):
+            chunks.append(" ".join(sentences[start_index:]))
+        return chunks
+    
+    def _semantic_split(self, embeddings: np.ndarray) -> np.ndarray:
+        """Indices of the sentences after which a new chunk starts"""
+        splitter = self.text_splitter
+        # Embeddings are normalized, so cosine distance is 1 - row-wise dot product
+        distances = 1.0 - np.einsum("ij,ij->i", embeddings[:-1], embeddings[1:])
+        
+        # LangChain's threshold helpers are numpy reductions and accept the array as is
+        if splitter.number_of_chunks is not None:
+            threshold = splitter._threshold_from_clusters(distances)
+            breakpoint_array = distances
+        else:
+            threshold, breakpoint_array = splitter._calculate_breakpoint_threshold(distances)
+        return np.flatnonzero(np.asarray(breakpoint_array) > threshold)
+
     def load_data_to_chunks(self, pages: list[Document], use_cache: bool = True):
         try:
-            # Load existing cache
-            if use_cache:
-                self._load_consolidated_cache()
-                if len(self.chunks) > 0:
-                    Logger.log(f"Loaded {len(self.chunks)} chunks from cache")
-            
-            # Filter uncached documents
-            uncached_pages = self.get_uncached_documents(pages)
-            if len(uncached_pages) < len(pages):
-                Logger.log(f"Skipping {len(pages) - len(uncached_pages)} already processed documents")
-            
+            # Load existing cache and keep only documents that still need chunking
+            uncached_pages = self._get_pages_to_process(pages, use_cache)
             if not uncached_pages:
-                Logger.log("All documents already processed")
                 return
             
             Logger.log(f"Processing {len(uncached_pages)} new documents with semantic chunking...")
             Logger.log(f"This may take a while - calculating embeddings for all documents...")
             
             # Process all uncached documents at once (simpler, faster)
-            docs = self.text_splitter.split_documents(uncached_pages)
+            docs = self._split_pages(uncached_pages)
             
             Logger.log(f"Semantic chunker created {len(docs)} chunks from {len(uncached_pages)} documents")
             Logger.log(f"Filtering meaningful chunks...")
@@ -90,6 +226,7 @@ class SemanticChunker(BaseChunker):
             meaningful_count = 0
             skipped_count = 0
             total_docs = len(docs)
+            chunk_ids = _bulk_uuid4(total_docs)
             
             for idx, doc in enumerate(docs, 1):
                 # Show progress every 1000 chunks
@@ -101,12 +238,13 @@ class SemanticChunker(BaseChunker):
                     skipped_count += 1
                     continue
                 
-                chunk_id = str(uuid.uuid4())
+                chunk_id = chunk_ids[idx - 1]
                 metadata = doc.metadata or {}
                 semantic_score = metadata.get("semantic_similarity", 0.95)
                 boundary_type = "semantic_boundary"
                 
-                chunk_obj = SemanticChunk(
+                # Every field is produced right here, so skip pydantic validation
+                chunk_obj = SemanticChunk.model_construct(
                     id=chunk_id,
                     content=doc.page_content,
                     source=metadata.get("source", "Unknown"),
@@ -141,6 +279,9 @@ class SemanticChunker(BaseChunker):
             Logger.log(f"Error in semantic chunking: {e}")
             self._save_consolidated_cache()
             raise
+        finally:
+            # Pages that failed keep no hash memo entry (and no page reference) past this call
+            self._doc_hash_memo.clear()
     
     def get_chunker_info(self):
         return {
@@ -154,6 +295,9 @@ class SemanticChunker(BaseChunker):
     def _get_chunk_type(self) -> str:
         return 'semantic'
     
+    def _get_chunk_class(self) -> type:
+        return SemanticChunk
+    
     def _reconstruct_chunk(self, chunk_dict: dict, chunk_type: str) -> SemanticChunk:
         """Reconstruct SemanticChunk object from dict"""
         return SemanticChunk(**chunk_dict)
\ No newline at end of file
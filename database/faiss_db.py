@@ -1,18 +1,43 @@
 import faiss
 import numpy as np
+import mmap
 import pickle
 import os
-from sentence_transformers import SentenceTransformer
 from logger import Logger
 from model import BaseChunk, SearchResult, Point
 from typing import Dict, List, Tuple, Optional
 from database.base import VectorStore, DenseSearchable
+from utils.embedding_cache import EmbeddingCache
+from utils.model_registry import get_sentence_transformer, encode_adaptive, encode_query, embedding_variant
+from utils.semantic_cache import SemanticCache
+from sentence_transformers import SentenceTransformer
+
+_INDEX_TYPES = ("flat", "sq_fp16", "sq8", "hnsw", "ivfpq")
+# Index types whose codebooks are trained on the first batch added
+_TRAINED_INDEX_TYPES = ("sq8", "ivfpq")
+# 8-bit PQ codes need at least this many training vectors per sub-quantizer
+_PQ_CENTROIDS = 256
+_SQ_TRAIN_SAMPLE = 50_000
+# Metadata pickles above this size are unpickled from an mmap rather than read into memory first
+_METADATA_MMAP_BYTES = 64 * 1024 * 1024
 
 class FAISS(VectorStore, DenseSearchable):
     def __init__(self, 
                  index_path: str = "./faiss_index", 
                  dense_model_name: str = "LazarusNLP/all-indo-e5-small-v4",
-                 collection_name: str = "documents"):
+                 collection_name: str = "documents",
+                 backend: str = "torch",
+                 embedding_cache_path: Optional[str] = "./chunk_cache/embeddings.db",
+                 index_type: str = "flat",
+                 hnsw_m: int = 32,
+                 ef_search: int = 64,
+                 nprobe: int = 16,
+                 save_every: int = 50_000,
+                 read_only: bool = False,
+                 use_gpu: bool = True,
+                 query_cache_size: int = 0,
+                 query_cache_threshold: float = 0.95,
+                 dense_model: Optional[SentenceTransformer] = None):
         """
         Initialize FAISS database
         
@@ -20,19 +45,56 @@ class FAISS(VectorStore, DenseSearchable):
             index_path: Path to store FAISS index files
             dense_model_name: Name of the sentence transformer model
             collection_name: Collection identifier for this database
+            backend: SentenceTransformer backend ("torch", "onnx", "openvino" or "onnx-int8")
+            embedding_cache_path: SQLite file of previously computed chunk embeddings (None disables it)
+            index_type: "flat" (exact search), "sq_fp16" / "sq8" (exact scan over half-size / quarter-size
+                vectors), "hnsw" (graph ANN) or "ivfpq" (clustered, product-quantized vectors for very
+                large corpora). sq8 and ivfpq are trained on the first batch added
+            hnsw_m: Graph neighbours per node for the HNSW index
+            ef_search: HNSW search breadth, higher is more accurate and slower
+            nprobe: IVF clusters visited per query
+            save_every: Write the index to disk after this many unsaved vectors from add_documents/store_arrays (store_chunks and close() always flush)
+            read_only: Search-only instance: memory-map the stored index instead of reading it into RAM,
+                and refuse writes
+            use_gpu: Serve searches from a GPU copy of the index when faiss-gpu and a CUDA device are available
+            query_cache_size: Recent queries whose results are reused for near-identical queries (0, the default, disables it)
+            query_cache_threshold: Cosine similarity at which an earlier query counts as the same question
+            dense_model: Already loaded model to embed with (e.g. the chunker's); dense_model_name must
+                still name it, it keys the embedding cache
         """
+        if index_type not in _INDEX_TYPES:
+            raise ValueError(f"Unknown FAISS index type: {index_type}. Choose from {_INDEX_TYPES}")
         self.index_path = index_path
         self.collection_name = collection_name
         self.dense_model_name = dense_model_name
+        self.index_type = index_type
+        self.hnsw_m = hnsw_m
+        self.ef_search = ef_search
+        self.nprobe = nprobe
+        self.save_every = save_every
+        self.read_only = read_only
+        self.use_gpu = use_gpu
+        self._gpu_resources = None
+        self.query_cache = SemanticCache(query_cache_size, query_cache_threshold)
+        # Vectors added since the index was last written to disk
+        self._unsaved = 0
         
-        Logger.log(f"Loading dense model: {dense_model_name}")
-        self.dense_model = SentenceTransformer(dense_model_name)
+        if dense_model is not None:
+            self.dense_model = dense_model
+        else:
+            Logger.log(f"Loading dense model: {dense_model_name}")
+            self.dense_model = get_sentence_transformer(dense_model_name, backend=backend)
         self.embedding_dim = self.dense_model.get_sentence_embedding_dimension()
+        self.embedding_cache = (
+            EmbeddingCache(embedding_cache_path, f"{dense_model_name}|{embedding_variant(self.dense_model)}")
+            if embedding_cache_path else None
+        )
         
         self.index = None
         self.id_to_payload = {}
-        self.id_to_index = {}
-        self.index_to_id = {}
+        self.id_to_index: Dict[str, int] = {}
+        # Chunk id of every index position, in insertion order
+        self.index_to_id: List[str] = []
         
         os.makedirs(index_path, exist_ok=True)
         
@@ -41,10 +103,90 @@ class FAISS(VectorStore, DenseSearchable):
         Logger.log(f"FAISS database initialized with collection: {collection_name}")
         
     def _create_index(self):
-        """Create a new FAISS index"""
-        self.index = faiss.IndexFlatIP(self.embedding_dim)
-        Logger.log(f"Created new FAISS index with dimension: {self.embedding_dim}")
+        """Create a new FAISS index of the configured type (inner product over normalized vectors)"""
+        if self.index_type == "hnsw":
+            self.index = faiss.IndexHNSWFlat(self.embedding_dim, self.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+            self.index.hnsw.efConstruction = 200
+        elif self.index_type == "sq_fp16":
+            self.index = faiss.IndexScalarQuantizer(
+                self.embedding_dim, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_INNER_PRODUCT
+            )
+        elif self.index_type in _TRAINED_INDEX_TYPES:
+            # Built for real on the first add, once there are vectors to train on
+            self.index = None
+        else:
+            self.index = faiss.IndexFlatIP(self.embedding_dim)
+        self._prepare_index()
+        Logger.log(f"Created new FAISS {self.index_type} index with dimension: {self.embedding_dim}")
+    
+    def _create_trained_index(self, vectors: np.ndarray):
+        """Build the sq8 / IVF-PQ index and train it on the first batch of vectors"""
+        n = len(vectors)
+        if self.index_type == "sq8":
+            self.index = faiss.IndexScalarQuantizer(
+                self.embedding_dim, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT
+            )
+            # Per-dimension ranges are all SQ8 learns, a large sample is plenty
+            self.index.train(vectors[:_SQ_TRAIN_SAMPLE])
+            Logger.log(f"Trained SQ8 index on {min(n, _SQ_TRAIN_SAMPLE)} vectors")
+            return
+        
+        # ~4·sqrt(N) clusters, each still backed by enough training points
+        nlist = max(1, min(4096, int(4 * np.sqrt(n)), n // 39))
+        m = next(m for m in (self.embedding_dim // 4, self.embedding_dim // 8, 1) if m and self.embedding_dim % m == 0)
+        if n < max(nlist, _PQ_CENTROIDS):
+            Logger.log(f"Only {n} vectors to train IVF-PQ on, using an exact flat index instead")
+            self.index_type = "flat"
+            self.index = faiss.IndexFlatIP(self.embedding_dim)
+            return
+        
+        quantizer = faiss.IndexFlatIP(self.embedding_dim)
+        self.index = faiss.IndexIVFPQ(quantizer, self.embedding_dim, nlist, m, 8, faiss.METRIC_INNER_PRODUCT)
+        self.index.train(vectors)
+        Logger.log(f"Trained IVF-PQ index on {n} vectors (nlist={nlist}, m={m})")
+    
+    def _prepare_index(self):
+        """Apply search settings, then move the index to the GPU when one can serve it"""
+        if self.index is None:
+            return
+        self._apply_search_params()
+        if not self.use_gpu or self._is_gpu_index():
+            return
+        if not hasattr(faiss, "StandardGpuResources") or faiss.get_num_gpus() == 0:
+            return
+        try:
+            if self._gpu_resources is None:
+                self._gpu_resources = faiss.StandardGpuResources()
+            self.index = faiss.index_cpu_to_gpu(self._gpu_resources, 0, self.index)
+            Logger.log(f"FAISS {self.index_type} index moved to GPU")
+        except Exception as e:
+            # e.g. HNSW has no GPU implementation
+            Logger.log(f"Keeping FAISS {self.index_type} index on CPU: {e}")
+    
+    def _is_gpu_index(self) -> bool:
+        return type(self.index).__name__.startswith("GpuIndex")
+    
+    def _apply_search_params(self):
+        """Search-time settings are not all stored in the index file, so they are set after every create/load"""
+        if isinstance(self.index, faiss.IndexHNSWFlat):
+            self.index.hnsw.efSearch = self.ef_search
+        elif isinstance(self.index, faiss.IndexIVF):
+            self.index.nprobe = self.nprobe
+    
+    @property
+    def _ntotal(self) -> int:
+        return self.index.ntotal if self.index is not None else 0
         
+    @staticmethod
+    def _read_metadata(metadata_file: str) -> Dict:
+        """Unpickle the metadata from one buffer: a single read, or an mmap for large files"""
+        with open(metadata_file, 'rb') as f:
+            if os.fstat(f.fileno()).st_size <= _METADATA_MMAP_BYTES:
+                return pickle.loads(f.read())
+            # Unpickles straight from the page cache instead of first copying the file into a bytes object
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return pickle.loads(mapped)
+    
     def _load_index(self):
         """Load existing FAISS index from disk"""
         index_file = os.path.join(self.index_path, f"{self.collection_name}.index")
@@ -52,13 +194,23 @@ class FAISS(VectorStore, DenseSearchable):
         
         if os.path.exists(index_file) and os.path.exists(metadata_file):
             try:
-                self.index = faiss.read_index(index_file)
+                # Memory-mapped indexes are paged in on demand, only touched vectors occupy RAM
+                flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY if self.read_only else 0
+                self.index = faiss.read_index(index_file, flags)
+                
+                metadata = self._read_metadata(metadata_file)
+                self.id_to_payload = metadata['id_to_payload']
+                self.id_to_index = metadata['id_to_index']
+                self.index_to_id = metadata['index_to_id']
+                if isinstance(self.index_to_id, dict):
+                    # Metadata written before positions were kept in a list
+                    self.index_to_id = [self.index_to_id[i] for i in range(len(self.index_to_id))]
+                stored_type = metadata.get('index_type', 'flat')
                 
-                with open(metadata_file, 'rb') as f:
-                    metadata = pickle.load(f)
-                    self.id_to_payload = metadata['id_to_payload']
-                    self.id_to_index = metadata['id_to_index']
-                    self.index_to_id = metadata['index_to_id']
+                if stored_type != self.index_type:
+                    Logger.log(f"Existing index is {stored_type}, not {self.index_type}; keeping it (delete the collection to rebuild)")
+                    self.index_type = stored_type
+                self._prepare_index()
                 
                 Logger.log(f"Loaded existing FAISS index with {self.index.ntotal} vectors")
             except Exception as e:
@@ -73,16 +225,23 @@ class FAISS(VectorStore, DenseSearchable):
             index_file = os.path.join(self.index_path, f"{self.collection_name}.index")
             metadata_file = os.path.join(self.index_path, f"{self.collection_name}_metadata.pkl")
             
-            faiss.write_index(self.index, index_file)
+            if self.index is None or self.read_only:
+                return
+            
+            # GPU indexes are serialized from a CPU copy
+            index = faiss.index_gpu_to_cpu(self.index) if self._is_gpu_index() else self.index
+            faiss.write_index(index, index_file)
             
             metadata = {
                 'id_to_payload': self.id_to_payload,
                 'id_to_index': self.id_to_index,
-                'index_to_id': self.index_to_id
+                'index_to_id': self.index_to_id,
+                'index_type': self.index_type
             }
             
             with open(metadata_file, 'wb') as f:
-                pickle.dump(metadata, f)
+                pickle.dump(metadata, f, protocol=pickle.HIGHEST_PROTOCOL)
+            self._unsaved = 0
                 
             Logger.log(f"Saved FAISS index with {self.index.ntotal} vectors")
         except Exception as e:
@@ -92,48 +251,75 @@ class FAISS(VectorStore, DenseSearchable):
     def add_documents(self, points: list[Point]):
         """Add documents to FAISS index"""
         try:
-            vectors = []
-            for point in points:
-                vectors.append(point.vector)
-                
-                point_id = str(point.id)
-                current_index = len(self.id_to_index)
-                
-                self.id_to_payload[point_id] = point.payload
-                self.id_to_index[point_id] = current_index
-                self.index_to_id[current_index] = point_id
-            
-            vectors_np = np.array(vectors, dtype=np.float32)
-            faiss.normalize_L2(vectors_np)  
-            self.index.add(vectors_np)
-            self._save_index()
-            
-            Logger.log(f"Added {len(points)} documents to FAISS index")
+            vectors_np = Point.bulk_vectors(points)
+            faiss.normalize_L2(vectors_np)
+            self._add_arrays([str(point.id) for point in points], vectors_np, [point.payload for point in points])
             
         except Exception as e:
             Logger.log(f"Error adding documents to FAISS: {e}")
             raise
     
+    def store_arrays(self, ids: List[str], vectors: np.ndarray, payloads: List[Dict]):
+        """Add precomputed embeddings as one (N, d) matrix with parallel id and payload lists.
+
+        The vectors are normalized on a copy, the caller's array is left untouched.
+        """
+        vectors_np = np.array(vectors, dtype=np.float32, order="C")
+        faiss.normalize_L2(vectors_np)
+        self._add_arrays(ids, vectors_np, payloads)
+    
+    def _add_arrays(self, ids: List[str], vectors_np: np.ndarray, payloads: List[Dict]):
+        """Add already-normalized float32 vectors with their ids and payloads in one index.add call"""
+        if self.read_only:
+            raise RuntimeError(f"FAISS collection {self.collection_name} was opened read-only")
+        if not ids:
+            return
+        start = len(self.index_to_id)
+        self.index_to_id.extend(ids)
+        for offset, (point_id, payload) in enumerate(zip(ids, payloads)):
+            self.id_to_payload[point_id] = payload
+            self.id_to_index[point_id] = start + offset
+        
+        if self.index is None:
+            self._create_trained_index(vectors_np)
+            self._prepare_index()
+        self.index.add(vectors_np)
+        # Cached results predate these vectors
+        self.query_cache.clear()
+        # Rewriting the whole index per batch makes bulk ingest quadratic, so save periodically
+        self._unsaved += len(ids)
+        if self._unsaved >= self.save_every:
+            self._save_index()
+        
+        Logger.log(f"Added {len(ids)} documents to FAISS index")
+    
     def dense_search(self, query: str, limit: int = 5) -> List[SearchResult]:
         """Search using dense embeddings only"""
         try:
-            if self.index.ntotal == 0:
+            if self._ntotal == 0:
                 Logger.log("No documents in FAISS index")
                 return []
             
-            query_vector = self.dense_model.encode([query])
-            query_vector = np.array(query_vector, dtype=np.float32)
-            faiss.normalize_L2(query_vector)
+            # Normalized by the encoder itself, no second pass with faiss.normalize_L2; the shared
+            # cached vector is copied into the (1, d) query matrix FAISS expects
+            query_vector = np.array(encode_query(self.dense_model, query)[None, :])
+            
+            cached = self.query_cache.get(query_vector, limit)
+            if cached is not None:
+                Logger.log(f"FAISS dense search served {len(cached)} cached results for query: '{query}'")
+                return cached
             
             scores, indices = self.index.search(query_vector, min(limit, self.index.ntotal))
             
+            # Drop FAISS's -1 padding with a mask and convert each row to Python values in one call,
+            # instead of per-element numpy scalar conversions in the loop
+            valid = indices[0] >= 0
             results = []
-            for score, idx in zip(scores[0], indices[0]):
-                if idx != -1:
-                    point_id = self.index_to_id[idx]
-                    payload = self.id_to_payload[point_id]
-                    results.append(SearchResult(id=point_id, payload=payload, score=float(score)))
+            for score, idx in zip(scores[0][valid].tolist(), indices[0][valid].tolist()):
+                point_id = self.index_to_id[idx]
+                results.append(SearchResult(id=point_id, payload=self.id_to_payload[point_id], score=score))
             
+            self.query_cache.put(query_vector, results, limit)
             Logger.log(f"FAISS dense search found {len(results)} results for query: '{query}'")
             return results
             
@@ -141,29 +327,52 @@ class FAISS(VectorStore, DenseSearchable):
             Logger.log(f"Error in FAISS dense search: {e}")
             return []
     
-    def store_chunks(self, chunks: Dict[str, BaseChunk]):
+    def store_chunks(self, chunks: Dict[str, BaseChunk], encode_batch_size: int = 256):
         """Store chunks in FAISS database"""
         try:
-            # Batch encode all texts at once (efficient)
+            # Batch encode all texts at once (efficient); the model length-sorts each call itself
             texts = [chunk.get_context() for chunk in chunks.values()]
-            embeddings = self.dense_model.encode(texts)
-            
-            # Create point objects with pre-computed embeddings
-            points = [
-                Point(id=chunk_id, vector=embeddings[i], payload=chunk.get_payload())
-                for i, (chunk_id, chunk) in enumerate(chunks.items())
-            ]
+            embeddings = self._encode_texts(texts, encode_batch_size)
             
-            self.add_documents(points)
+            # The encoder already returns normalized float32 rows, hand them to the index as is
+            self._add_arrays(
+                [str(chunk_id) for chunk_id in chunks],
+                np.ascontiguousarray(embeddings, dtype=np.float32),
+                [chunk.get_payload() for chunk in chunks.values()]
+            )
+            # One write per finished store, so it survives a crash before close()
+            if self._unsaved:
+                self._save_index()
             Logger.log(f"Stored {len(chunks)} chunks in FAISS database")
             
         except Exception as e:
             Logger.log(f"Error storing chunks in FAISS: {e}")
             raise
     
+    def _encode_texts(self, texts: List[str], batch_size: int = 256) -> np.ndarray:
+        """Normalized embeddings of texts, skipping texts already in the embedding cache"""
+        def encode(missing: List[str]) -> np.ndarray:
+            return encode_adaptive(self.dense_model, missing, batch_size, normalize_embeddings=True)
+        
+        if self.embedding_cache is None:
+            return encode(texts)
+        return self.embedding_cache.encode(texts, encode)
+    
+    def get_info(self) -> Dict:
+        """Collection statistics, including how the vectors are stored"""
+        return {
+            "collection_name": self.collection_name,
+            "index_type": self.index_type,
+            "vectors_count": self._ntotal,
+            "embedding_dim": self.embedding_dim,
+            "dense_model": self.dense_model_name
+        }
+    
     def delete_collection(self):
         """Delete the FAISS index and metadata"""
         try:
+            if self.read_only:
+                raise RuntimeError(f"FAISS collection {self.collection_name} was opened read-only")
             index_file = os.path.join(self.index_path, f"{self.collection_name}.index")
             metadata_file = os.path.join(self.index_path, f"{self.collection_name}_metadata.pkl")
             
@@ -175,7 +384,9 @@ class FAISS(VectorStore, DenseSearchable):
             self._create_index()
             self.id_to_payload = {}
             self.id_to_index = {}
-            self.index_to_id = {}
+            self.index_to_id = []
+            self._unsaved = 0
+            self.query_cache.clear()
             
             Logger.log(f"Deleted FAISS collection: {self.collection_name}")
             
@@ -186,7 +397,10 @@ class FAISS(VectorStore, DenseSearchable):
     def close(self):
         """Clean up resources"""
         try:
-            self._save_index()
+            if self._unsaved:
+                self._save_index()
+            if self.embedding_cache is not None:
+                self.embedding_cache.close()
             Logger.log("FAISS database closed successfully")
         except Exception as e:
             Logger.log(f"Error closing FAISS database: {e}")
\ No newline at end of file
@@ -1,31 +1,66 @@
 from qdrant_client import QdrantClient
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from logger import Logger
-from qdrant_client.models import VectorParams, Distance, SparseVectorParams, PointStruct, SparseVector,Document, ScoredPoint, Prefetch, FusionQuery, Fusion, MultiVectorConfig, MultiVectorComparator, HnswConfigDiff
+from qdrant_client.models import VectorParams, Distance, SparseVectorParams, PointStruct, SparseVector,Document, ScoredPoint, Prefetch, FusionQuery, Fusion, MultiVectorConfig, MultiVectorComparator, HnswConfigDiff, ScalarQuantization, ScalarQuantizationConfig, ScalarType, SearchParams, QuantizationSearchParams
 from fastembed import TextEmbedding, LateInteractionTextEmbedding, SparseTextEmbedding
 from fastembed.rerank.cross_encoder import TextCrossEncoder
-from sentence_transformers import SentenceTransformer
-from model import BaseChunk
-from typing import Dict
+from model import BaseChunk, AgenticChunk
+from typing import Dict, List, Optional
 from database.base import VectorStore, DenseSearchable, SparseSearchable, HybridSearchable, ColbertSearchable, CrossEncoderSearchable
 import json
 import os
+from collections import deque
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from utils.embedding_cache import EmbeddingCache
+from utils.model_registry import get_sentence_transformer, encode_adaptive, encode_query, embedding_variant
+from utils.semantic_cache import SemanticCache
+
+# Recorded in the resume file; batch numbers from another ordering must not be reused
+_BATCH_ORDER = "length"
+# Dense vectors are encoded this many model batches at a time during store_chunks
+_DENSE_WINDOW_BATCHES = 8
+# Dense vectors are kept as int8 in RAM; the shortlist is oversampled and rescored on the float vectors
+_DENSE_QUANTIZATION = ScalarQuantization(
+    scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=True)
+)
+_DENSE_SEARCH_PARAMS = SearchParams(quantization=QuantizationSearchParams(rescore=True, oversampling=2.0))
+
+
+@lru_cache(maxsize=None)
+def _fastembed_model(model_class, model_name: str):
+    """One fastembed model per (class, name) in the process, shared by every Qdrant instance.
+
+    Each collection under test gets its own Qdrant object; without this every one of them would load
+    its own copy of the sparse, late-interaction and reranker models.
+    """
+    return model_class(model_name)
 
 class Qdrant(VectorStore, DenseSearchable, SparseSearchable, HybridSearchable, ColbertSearchable, CrossEncoderSearchable):
-    def __init__(self, qdrant_url : str = "http://localhost:6333", qdrant_api_key: str = None, collection_name: str = "documents", late_interaction_model_name: str = "jinaai/jina-colbert-v2", sparse_model_name: str = "Qdrant/bm25", dense_model_name: str = "LazarusNLP/all-indo-e5-small-v4", reranker_model_name: str = "jinaai/jina-reranker-v2-base-multilingual"):
+    def __init__(self, qdrant_url : str = "http://localhost:6333", qdrant_api_key: str = None, collection_name: str = "documents", late_interaction_model_name: str = "jinaai/jina-colbert-v2", sparse_model_name: str = "Qdrant/bm25", dense_model_name: str = "LazarusNLP/all-indo-e5-small-v4", reranker_model_name: str = "jinaai/jina-reranker-v2-base-multilingual", dense_backend: str = "torch", embedding_cache_path: Optional[str] = "./chunk_cache/embeddings.db", query_cache_size: int = 0, query_cache_threshold: float = 0.95, quantize_dense: bool = True):
         Logger.log("qdrant url" + qdrant_url)
         self.client = QdrantClient(url=qdrant_url, api_key=qdrant_api_key)
         self.collection_name = collection_name
         
-        self.sparse_model = SparseTextEmbedding(sparse_model_name)
-        self.dense_model = SentenceTransformer(dense_model_name)
-        self.late_interaction_model = LateInteractionTextEmbedding(late_interaction_model_name)
-        self.reranker = TextCrossEncoder(reranker_model_name)
+        self.sparse_model = _fastembed_model(SparseTextEmbedding, sparse_model_name)
+        self.dense_model = get_sentence_transformer(dense_model_name, backend=dense_backend)
+        self.late_interaction_model = _fastembed_model(LateInteractionTextEmbedding, late_interaction_model_name)
+        self.reranker = _fastembed_model(TextCrossEncoder, reranker_model_name)
         
         self.sparse_model_name = sparse_model_name
         self.dense_model_name = dense_model_name
         self.late_interaction_model_name = late_interaction_model_name
         self.reranker_model_name = reranker_model_name
+        # Dense vectors of chunk texts from earlier ingests (None disables it)
+        self.embedding_cache = (
+            EmbeddingCache(embedding_cache_path, f"{dense_model_name}|{embedding_variant(self.dense_model)}")
+            if embedding_cache_path else None
+        )
+        # Dense search results of recent queries, reused for near-identical queries (off by default; size 0 disables it)
+        self.query_cache = SemanticCache(query_cache_size, query_cache_threshold)
+        # Only applies when this creates the collection
+        self.quantize_dense = quantize_dense
         self._create_collection_if_not_exists()
         
     def _create_collection_if_not_exists(self):
@@ -35,7 +70,8 @@ class Qdrant(VectorStore, DenseSearchable, SparseSearchable, HybridSearchable, C
                 vectors_config={
                     "dense": VectorParams(
                         size=self.dense_model.get_sentence_embedding_dimension(),
-                        distance=Distance.COSINE
+                        distance=Distance.COSINE,
+                        quantization_config=_DENSE_QUANTIZATION if self.quantize_dense else None
                     ),
                     "late_interaction": VectorParams(
                         size=LateInteractionTextEmbedding.get_embedding_size(self.late_interaction_model_name),
@@ -59,6 +95,7 @@ class Qdrant(VectorStore, DenseSearchable, SparseSearchable, HybridSearchable, C
                 collection_name=self.collection_name,
                 points=documents
             )
+            self.query_cache.clear()
         except Exception as e:
             Logger.log(f"Error adding documents: {e}")
             raise
@@ -66,18 +103,30 @@ class Qdrant(VectorStore, DenseSearchable, SparseSearchable, HybridSearchable, C
     def delete_collection(self):
         try:
             self.client.delete_collection(collection_name=self.collection_name)
+            self.query_cache.clear()
         except Exception as e:
             Logger.log(f"Error deleting collection: {e}")
             raise
         
+    def _encode_query(self, query: str) -> List[float]:
+        """Dense query vector (shared per-process query embedding cache), as the plain float list the client sends"""
+        return encode_query(self.dense_model, query).tolist()
+        
     def dense_search(self, query: str, limit: int = 5) -> list[ScoredPoint]:
         try:
+            query_vector = self._encode_query(query)
+            cached = self.query_cache.get(query_vector, limit)
+            if cached is not None:
+                return cached
+            
             search_result = self.client.query_points(
                 collection_name=self.collection_name,
-                query=self.dense_model.encode(query),
+                query=query_vector,
                 limit=limit,
-                using="dense"
+                using="dense",
+                search_params=_DENSE_SEARCH_PARAMS
             )
+            self.query_cache.put(query_vector, search_result.points, limit)
             return search_result.points
         except Exception as e:
             Logger.log(f"Error searching documents: {e}")
@@ -111,9 +160,10 @@ class Qdrant(VectorStore, DenseSearchable, SparseSearchable, HybridSearchable, C
                         limit=initial_limit
                     ),
                     Prefetch(
-                        query=self.dense_model.encode(query),
+                        query=self._encode_query(query),
                         using="dense",
-                        limit=initial_limit
+                        limit=initial_limit,
+                        params=_DENSE_SEARCH_PARAMS
                     )
                 ],
                 limit=limit,
@@ -138,9 +188,10 @@ class Qdrant(VectorStore, DenseSearchable, SparseSearchable, HybridSearchable, C
                         limit=initial_limit
                     ),
                     Prefetch(
-                        query=self.dense_model.encode(query),
+                        query=self._encode_query(query),
                         using="dense",
-                        limit=initial_limit
+                        limit=initial_limit,
+                        params=_DENSE_SEARCH_PARAMS
                     )
                 ],
                 limit=initial_limit,
@@ -179,7 +230,10 @@ class Qdrant(VectorStore, DenseSearchable, SparseSearchable, HybridSearchable, C
                 return []
             
             # Step 2: Extract documents for reranking
-            documents = [hit.payload.get('full_text', '') for hit in initial_results]
+            documents = [
+                AgenticChunk.context_from_payload(hit.payload) if 'propositions' in hit.payload else hit.payload.get('full_text', '')
+                for hit in initial_results
+            ]
             
             # Step 3: Rerank with cross-encoder
             rerank_scores = list(self.reranker.rerank(query, documents))
@@ -205,8 +259,12 @@ class Qdrant(VectorStore, DenseSearchable, SparseSearchable, HybridSearchable, C
             return []
         
         
-    def store_chunks(self, chunks: Dict[str, BaseChunk], batch_size: int = 8, resume: bool = True):
-        keys = list(chunks.keys())
+    def store_chunks(self, chunks: Dict[str, BaseChunk], batch_size: int = 8, resume: bool = True, encode_batch_size: int = 256, upload_parallel: int = 4):
+        # Upload batches group chunks of similar length, so the sparse and late-interaction models
+        # (which pad each batch to its longest text) waste little work on padding. The stable sort
+        # keeps the order, and so the batch numbers used for resuming, deterministic
+        contexts = {key: chunk.get_context() for key, chunk in chunks.items()}
+        keys = sorted(chunks.keys(), key=lambda key: len(contexts[key]))
         total = len(keys)
         progress_file = f".qdrant_progress_{self.collection_name}.json"
         
@@ -215,7 +273,10 @@ class Qdrant(VectorStore, DenseSearchable, SparseSearchable, HybridSearchable, C
             try:
                 with open(progress_file, 'r') as f:
                     progress = json.load(f)
-                    completed_batches = set(progress.get('completed_batches', []))
+                    if progress.get('order') != _BATCH_ORDER:
+                        Logger.log("Progress file was written with a different batch order, starting fresh")
+                    else:
+                        completed_batches = set(progress.get('completed_batches', []))
                     if completed_batches:
                         Logger.log(f"Resuming: {len(completed_batches)} batches already completed")
             except Exception as e:
@@ -223,66 +284,114 @@ class Qdrant(VectorStore, DenseSearchable, SparseSearchable, HybridSearchable, C
         
         Logger.log(f"Storing {total} chunks to Qdrant in batches of {batch_size}")
         
-        batch_num = 0
-        for start in range(0, total, batch_size):
-            if batch_num in completed_batches:
-                batch_num += 1
-                continue
-            
-            end = min(start + batch_size, total)
-            batch_keys = keys[start:end]
-            batch_values = [chunks[k] for k in batch_keys]
-            contexts = [chunk.get_context() for chunk in batch_values]
-
-            # Create embeddings per batch to reduce peak memory
-            dense_embeddings = list(self.dense_model.encode(contexts, batch_size=min(batch_size, len(contexts))))
-            sparse_embeddings = list(self.sparse_model.embed(contexts))
-            late_interaction_embeddings = list(self.late_interaction_model.embed(contexts))
-
-            points = []
-            for dense_vec, sparse_vec, late_interaction_vec, key, value in zip(
-                dense_embeddings, sparse_embeddings, late_interaction_embeddings, batch_keys, batch_values
-            ):
-                point = PointStruct(
-                    id=str(key),
-                    vector={
-                        "dense": dense_vec,
-                        "sparse": sparse_vec.as_object(),
-                        "late_interaction": late_interaction_vec
-                    },
-                    payload=value.get_payload()
-                )
-                points.append(point)
-
+        pending = [(batch_num, start) for batch_num, start in enumerate(range(0, total, batch_size)) if batch_num not in completed_batches]
+        
+        def finish_upload(batch_num, start, end, size, future):
             try:
-                self.client.upsert(
-                    collection_name=self.collection_name,
-                    points=points,
-                    wait=True
-                )
+                future.result()
                 completed_batches.add(batch_num)
                 
                 # Save progress
                 with open(progress_file, 'w') as f:
-                    json.dump({'completed_batches': list(completed_batches)}, f)
+                    json.dump({'order': _BATCH_ORDER, 'completed_batches': list(completed_batches)}, f)
                 
-                Logger.log(f"✓ Stored batch {batch_num} ({start}-{end}, {len(points)} chunks)")
+                Logger.log(f"✓ Stored batch {batch_num} ({start}-{end}, {size} chunks)")
             except Exception as e:
                 Logger.log(f"Error adding documents for batch {batch_num} ({start}-{end}): {e}")
                 Logger.log(f"Progress saved to {progress_file}. Run again to resume.")
                 raise
+        
+        # Upserts run on a few threads while the next batches are embedded; at most
+        # upload_parallel batches are in flight, which also bounds the points held in memory
+        in_flight = deque()
+        with ThreadPoolExecutor(max_workers=upload_parallel) as executor:
+            for batch_num, start, end, points in self._iter_point_batches(chunks, keys, contexts, pending, batch_size, encode_batch_size):
+                future = executor.submit(
+                    self.client.upsert,
+                    collection_name=self.collection_name,
+                    points=points,
+                    wait=True
+                )
+                in_flight.append((batch_num, start, end, len(points), future))
+                if len(in_flight) >= upload_parallel:
+                    finish_upload(*in_flight.popleft())
             
-            batch_num += 1
+            while in_flight:
+                finish_upload(*in_flight.popleft())
         
         # Cleanup progress file on success
         if os.path.exists(progress_file):
             os.remove(progress_file)
+        self.query_cache.clear()
         Logger.log(f"✓ All chunks stored successfully!")
         
             
         
+    def _iter_point_batches(self, chunks: Dict[str, BaseChunk], keys: List[str], contexts: Dict[str, str],
+                            pending: List[tuple], batch_size: int, encode_batch_size: int):
+        """Yield (batch_num, start, end, points) for the pending upload batches, embedding lazily.
+
+        Dense vectors are encoded for a window of upcoming batches at a time, large enough to keep
+        the model at encode_batch_size (it length-sorts internally) but without holding vectors for
+        the whole collection; sparse and late-interaction vectors are computed per batch.
+        """
+        window_batches = max(1, (encode_batch_size * _DENSE_WINDOW_BATCHES) // batch_size)
+        total = len(keys)
+        for window_start in range(0, len(pending), window_batches):
+            window = pending[window_start:window_start + window_batches]
+            window_keys = [key for _, start in window for key in keys[start:start + batch_size]]
+            Logger.log(f"Encoding dense vectors for {len(window_keys)} chunks...")
+            dense_by_key = dict(zip(window_keys, self._encode_dense([contexts[k] for k in window_keys], encode_batch_size)))
+            
+            for batch_num, start in window:
+                end = min(start + batch_size, total)
+                batch_keys = keys[start:end]
+                batch_contexts = [contexts[k] for k in batch_keys]
+                
+                dense_embeddings = [dense_by_key.pop(k) for k in batch_keys]
+                sparse_embeddings = self.sparse_model.embed(batch_contexts)
+                late_interaction_embeddings = self.late_interaction_model.embed(batch_contexts)
+                
+                points = [
+                    PointStruct(
+                        id=str(key),
+                        vector={
+                            "dense": dense_vec,
+                            "sparse": sparse_vec.as_object(),
+                            "late_interaction": late_interaction_vec
+                        },
+                        payload=chunks[key].get_payload()
+                    )
+                    for dense_vec, sparse_vec, late_interaction_vec, key in zip(
+                        dense_embeddings, sparse_embeddings, late_interaction_embeddings, batch_keys
+                    )
+                ]
+                yield batch_num, start, end, points
+        
+    def _encode_dense(self, texts: List[str], batch_size: int = 256) -> np.ndarray:
+        """Normalized dense embeddings of texts, skipping texts already in the embedding cache"""
+        def encode(missing: List[str]) -> np.ndarray:
+            return encode_adaptive(self.dense_model, missing, batch_size, normalize_embeddings=True)
+        
+        if self.embedding_cache is None:
+            return encode(texts)
+        return self.embedding_cache.encode(texts, encode)
+    
+    def get_info(self) -> Dict:
+        """Collection statistics, one get_collection round-trip"""
+        info = self.client.get_collection(collection_name=self.collection_name)
+        return {
+            "collection_name": self.collection_name,
+            "status": str(info.status),
+            "points_count": info.points_count,
+            "indexed_vectors_count": info.indexed_vectors_count,
+            "dense_model": self.dense_model_name
+        }
+    
     def close(self):
         self.client.close()
+        if self.embedding_cache is not None:
+            self.embedding_cache.close()
     
         
 
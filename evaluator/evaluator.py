@@ -3,7 +3,8 @@ RAGAS Evaluator
 Handles evaluation of RAG systems using RAGAS metrics
 """
 
-import json
+import asyncio
+import orjson
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 
@@ -21,7 +22,8 @@ from rag.pipeline import RAGPipeline
 class RAGASEvaluator:
     """Evaluate RAG systems using RAGAS metrics"""
     
-    def __init__(self, testset_path: str, timeout: int = 300, cache_dir: str = "./evaluation_cache"):
+    def __init__(self, testset_path: str, timeout: int = 300, cache_dir: str = "./evaluation_cache",
+                 max_concurrent_questions: int = 4, evaluation_workers: int = 1):
         """
         Initialize RAGAS evaluator
         
@@ -29,11 +31,15 @@ class RAGASEvaluator:
             testset_path: Path to testset JSON file
             timeout: Timeout for evaluation in seconds
             cache_dir: Directory to cache generation payloads
+            max_concurrent_questions: Questions answered at once; keep below the LLM provider's rate limit
+            evaluation_workers: Concurrent RAGAS metric calls against the evaluator LLM (1 by default to stay under its rate limit)
         """
         self.config = Config()
         self.testset_path = testset_path
         self.timeout = timeout
         self.cache_dir = cache_dir
+        self.max_concurrent_questions = max_concurrent_questions
+        self.evaluation_workers = evaluation_workers
         self.questions: List[str] = []
         self.ground_truths: List[str] = []
         
@@ -86,8 +92,8 @@ class RAGASEvaluator:
     def _load_testset(self):
         """Load test questions and ground truths"""
         try:
-            with open(self.testset_path, 'r', encoding='utf-8') as f:
-                testset_data = json.load(f)
+            with open(self.testset_path, 'rb') as f:
+                testset_data = orjson.loads(f.read())
             
             for item in testset_data["questions"]:
                 self.questions.append(item["question"])
@@ -99,7 +105,7 @@ class RAGASEvaluator:
             Logger.log(f"Error loading testset: {e}")
             raise
     
-    def _process_single_question(
+    async def _process_single_question(
         self, 
         pipeline: RAGPipeline, 
         question: str, 
@@ -123,7 +129,7 @@ class RAGASEvaluator:
         Logger.log(f"Processing question {question_num}/{total_questions}: {question[:50]}...")
         
         try:
-            result = pipeline.query(question)
+            result = await pipeline.query_async(question)
             contexts = self._extract_contexts(result.get('sources', []))
             
             return {
@@ -141,6 +147,19 @@ class RAGASEvaluator:
                 "reference": ground_truth
             }
     
+    async def _generate_evaluation_data(self, pipeline: RAGPipeline) -> List[Dict[str, Any]]:
+        """Answer every test question, max_concurrent_questions at a time, keeping testset order"""
+        semaphore = asyncio.Semaphore(self.max_concurrent_questions)
+        total = len(self.questions)
+        
+        async def bounded(i: int, question: str, ground_truth: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await self._process_single_question(pipeline, question, ground_truth, i + 1, total)
+        
+        return await asyncio.gather(*(
+            bounded(i, q, gt) for i, (q, gt) in enumerate(zip(self.questions, self.ground_truths))
+        ))
+    
     def _extract_contexts(self, sources: List[Any]) -> List[str]:
         """Extract context texts from sources"""
         contexts = []
@@ -162,8 +181,8 @@ class RAGASEvaluator:
         cache_path = self._get_cache_path(config_name)
         if os.path.exists(cache_path):
             try:
-                with open(cache_path, 'r', encoding='utf-8') as f:
-                    cached_data = json.load(f)
+                with open(cache_path, 'rb') as f:
+                    cached_data = orjson.loads(f.read())
                 Logger.log(f"✓ Loaded cached payload from {cache_path}")
                 return cached_data
             except Exception as e:
@@ -174,8 +193,9 @@ class RAGASEvaluator:
         """Save generation payload to cache"""
         cache_path = self._get_cache_path(config_name)
         try:
-            with open(cache_path, 'w', encoding='utf-8') as f:
-                json.dump(evaluation_data, f, indent=2, ensure_ascii=False)
+            # Compact: the cache is only read back by this class
+            with open(cache_path, 'wb') as f:
+                f.write(orjson.dumps(evaluation_data))
             Logger.log(f"✓ Saved payload cache to {cache_path}")
         except Exception as e:
             Logger.log(f"Error saving cache: {e}")
@@ -246,7 +266,7 @@ class RAGASEvaluator:
                 
         return clean_scores
     
-    def evaluate_pipeline(
+    async def evaluate_pipeline(
         self,
         pipeline: RAGPipeline,
         config_name: str,
@@ -292,10 +312,7 @@ class RAGASEvaluator:
                     }
                 
                 Logger.log("Generating responses...")
-                evaluation_data = [
-                    self._process_single_question(pipeline, q, gt, i+1, len(self.questions))
-                    for i, (q, gt) in enumerate(zip(self.questions, self.ground_truths))
-                ]
+                evaluation_data = await self._generate_evaluation_data(pipeline)
                 
                 # Save to cache
                 if use_cache:
@@ -304,7 +321,7 @@ class RAGASEvaluator:
             # Run RAGAS evaluation
             Logger.log(f"Running RAGAS evaluation for {config_name}...")
             evaluation_dataset = EvaluationDataset.from_list(evaluation_data)
-            run_config = RunConfig(max_workers=1, timeout=self.timeout)
+            run_config = RunConfig(max_workers=self.evaluation_workers, timeout=self.timeout)
             
             ragas_result = evaluate(
                 dataset=evaluation_dataset,
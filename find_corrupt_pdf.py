@@ -0,0 +1,76 @@
+"""
+Find corrupt PDFs in a folder before ingesting it
+By default only the file structure is checked (header, trailer, xref, page tree); --deep also
+extracts the text of the first page. Files are checked in parallel processes
+"""
+import os
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+from pypdf import PdfReader
+from logger import Logger
+
+
+# Bytes read from each end of the file for the structural check
+_PROBE_BYTES = 1024
+
+
+def _check_one(file_path: str, deep: bool = False) -> Tuple[str, Optional[str]]:
+    """(path, None) for a readable PDF, (path, error message) otherwise"""
+    try:
+        with open(file_path, 'rb') as f:
+            if not f.read(_PROBE_BYTES).startswith(b'%PDF-'):
+                return file_path, "missing %PDF- header"
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - _PROBE_BYTES))
+            tail = f.read()
+            if b'startxref' not in tail or b'%%EOF' not in tail:
+                return file_path, "missing startxref / %%EOF trailer (truncated file?)"
+            
+            # Parses the xref table, trailer and page tree, but no content streams
+            f.seek(0)
+            reader = PdfReader(f, strict=False)
+            page_count = len(reader.pages)
+            if deep and page_count:
+                reader.pages[0].extract_text()
+        return file_path, None
+    except Exception as e:
+        return file_path, str(e)
+
+
+def check_pdf_files(folder: str, max_workers: Optional[int] = None, deep: bool = False) -> List[Tuple[str, str]]:
+    """Return (path, error) for every PDF in folder that cannot be read"""
+    pdf_files = sorted(
+        os.path.join(folder, file_name)
+        for file_name in os.listdir(folder)
+        if file_name.lower().endswith(".pdf")
+    )
+    Logger.log(f"Checking {len(pdf_files)} PDF files in {folder}")
+    
+    corrupt = []
+    # Parsing is CPU-bound and independent per file, so it scales with processes
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for checked, (file_path, error) in enumerate(executor.map(partial(_check_one, deep=deep), pdf_files, chunksize=16), 1):
+            if error is not None:
+                corrupt.append((file_path, error))
+                Logger.log(f"✗ {os.path.basename(file_path)}: {error}")
+            if checked % 100 == 0 or checked == len(pdf_files):
+                Logger.log(f"Checked {checked}/{len(pdf_files)} files")
+    
+    Logger.log(f"✓ {len(pdf_files) - len(corrupt)} valid, {len(corrupt)} corrupt")
+    return corrupt
+
+
+def main():
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Find corrupt PDF files in a folder")
+    parser.add_argument("folder", help="Folder containing PDF files")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--deep", action="store_true", help="Also extract the first page's text (much slower)")
+    
+    args = parser.parse_args()
+    check_pdf_files(args.folder, max_workers=args.workers, deep=args.deep)
+
+if __name__ == "__main__":
+    main()
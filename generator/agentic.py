@@ -2,6 +2,7 @@ from database.base import VectorStore
 from logger import Logger
 from langchain_core.prompts import ChatPromptTemplate
 from llm import BaseLLM
+from model.chunk.agentic_chunk import AgenticChunk
 from rag.search_strategy import SearchStrategy
 from .base import BaseGenerator
 
@@ -10,7 +11,7 @@ class AgenticGenerator(BaseGenerator):
         super().__init__(database, llm, search_strategy)
         
     def generate_answer(self, query: str, limit: int = 5):
-        relevant_chunks = self.search_strategy.search(self.database, query, limit)
+        relevant_chunks = self.search(query, limit)
         if not relevant_chunks:
             return {
                 "answer": "Maaf, saya tidak menemukan informasi yang relevan dalam dokumen hukum.",
@@ -18,24 +19,23 @@ class AgenticGenerator(BaseGenerator):
             }
         
         Logger.log(f"Found {len(relevant_chunks)} relevant chunks for query: '{query}'")
-        Logger.log(f"Relevant chunks: {relevant_chunks}")
+        Logger.debug("Relevant chunk ids: %s", [chunk.id for chunk in relevant_chunks])
         
         context_parts = []
         sources = []
         
         for idx, chunk in enumerate(relevant_chunks):
             payload = chunk.payload
-            context_parts.append(
-                f"[Sumber {idx}] {payload['title']}\n"
-                f"Ringkasan: {payload['summary']}\n"
-                f"Konten:\n{payload['full_text']}\n"
-            )
+            title = payload['title']
+            summary = payload['summary']
+            full_text = AgenticChunk.context_from_payload(payload)
+            context_parts.append(f"[Sumber {idx}] {title}\nRingkasan: {summary}\nKonten:\n{full_text}\n")
             sources.append({
                 "index": idx,
-                "title": payload['title'],
-                "summary": payload['summary'],
+                "title": title,
+                "summary": summary,
                 "score": chunk.score,
-                "content": payload['full_text']
+                "content": full_text
             }) 
         
         context = "\n---\n".join(context_parts)
@@ -48,7 +48,7 @@ class AgenticGenerator(BaseGenerator):
                 "sources": sources,
                 "query": query
             }
-            Logger.log(f"Jawaban berhasil di-generate untuk query: {payload}")
+            Logger.log(f"Jawaban berhasil di-generate untuk query: {len(answer)} karakter, {len(sources)} sumber")
             
             return payload
         
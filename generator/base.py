@@ -1,57 +1,111 @@
+from collections import OrderedDict
+from typing import Dict, List
+import asyncio
+import threading
+import time
 from database.base import VectorStore
 from langchain_core.prompts import ChatPromptTemplate
 from llm import BaseLLM
 from rag.search_strategy import SearchStrategy
 
+# Static, so built once at import instead of on every question
+_ANSWER_PROMPT = ChatPromptTemplate.from_messages([
+    (
+        "system",
+        """
+        Anda adalah asisten hukum AI yang membantu menjawab pertanyaan tentang dokumen hukum Indonesia.
+        
+        Tugas Anda:
+        1. Berikan jawaban yang akurat berdasarkan konteks dokumen hukum yang diberikan
+        2. Jika informasi tidak ada dalam konteks, katakan dengan jelas
+        3. Gunakan bahasa formal dan profesional
+        4. Sebutkan pasal, undang-undang, atau referensi hukum yang spesifik jika ada
+        5. Jika ada interpretasi, jelaskan dengan jelas bahwa itu adalah interpretasi
+        
+        Format jawaban:
+        - Mulai dengan jawaban langsung
+        - Berikan penjelasan detail jika diperlukan
+        - Sebutkan dasar hukum atau sumber yang relevan
+        - Jika ada ketidakpastian, sebutkan dengan jelas
+        
+        PENTING: Hanya gunakan informasi dari konteks yang diberikan. Jangan menambahkan informasi dari 
+        pengetahuan umum Anda tanpa menyebutkan bahwa itu adalah informasi tambahan.
+        """
+    ),
+    (
+        "user",
+        """
+        Konteks dari dokumen hukum:
+        
+        {context}
+        
+        ---
+        
+        Pertanyaan: {question}
+        
+        Berikan jawaban yang lengkap dan akurat berdasarkan konteks di atas.
+        """
+    )
+])
+
+
 class BaseGenerator:
-    def __init__(self, database: VectorStore, llm: BaseLLM, search_strategy: SearchStrategy):
+    def __init__(self, database: VectorStore, llm: BaseLLM, search_strategy: SearchStrategy,
+                 search_cache_size: int = 0, search_cache_ttl: float = 600.0):
         self.database = database
         self.llm = llm
         self.search_strategy = search_strategy
+        # (normalized query, limit) -> (time, results) of recent searches (off by default; size 0 disables it)
+        self.search_cache_size = search_cache_size
+        self.search_cache_ttl = search_cache_ttl
+        self._search_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._search_lock = threading.Lock()
+    
+    def search(self, query: str, limit: int = 5) -> list:
+        """search_strategy.search, reusing the results of a recent identical query"""
+        if self.search_cache_size <= 0:
+            return self.search_strategy.search(self.database, query, limit)
+        
+        key = (" ".join(query.split()), limit)
+        now = time.monotonic()
+        with self._search_lock:
+            entry = self._search_cache.get(key)
+            if entry is not None and now - entry[0] < self.search_cache_ttl:
+                self._search_cache.move_to_end(key)
+                return entry[1]
+        
+        results = self.search_strategy.search(self.database, query, limit)
+        # Stores return [] on errors too, so empty results are not remembered
+        if results:
+            with self._search_lock:
+                self._search_cache[key] = (now, results)
+                self._search_cache.move_to_end(key)
+                while len(self._search_cache) > self.search_cache_size:
+                    self._search_cache.popitem(last=False)
+        return results
+    
+    def clear_search_cache(self):
+        with self._search_lock:
+            self._search_cache.clear()
     
     def generate_prompt(self, context: str, question: str):
-        prompt = ChatPromptTemplate.from_messages([
-            (
-                "system",
-                """
-                Anda adalah asisten hukum AI yang membantu menjawab pertanyaan tentang dokumen hukum Indonesia.
-                
-                Tugas Anda:
-                1. Berikan jawaban yang akurat berdasarkan konteks dokumen hukum yang diberikan
-                2. Jika informasi tidak ada dalam konteks, katakan dengan jelas
-                3. Gunakan bahasa formal dan profesional
-                4. Sebutkan pasal, undang-undang, atau referensi hukum yang spesifik jika ada
-                5. Jika ada interpretasi, jelaskan dengan jelas bahwa itu adalah interpretasi
-                
-                Format jawaban:
-                - Mulai dengan jawaban langsung
-                - Berikan penjelasan detail jika diperlukan
-                - Sebutkan dasar hukum atau sumber yang relevan
-                - Jika ada ketidakpastian, sebutkan dengan jelas
-                
-                PENTING: Hanya gunakan informasi dari konteks yang diberikan. Jangan menambahkan informasi dari 
-                pengetahuan umum Anda tanpa menyebutkan bahwa itu adalah informasi tambahan.
-                """
-            ),
-            (
-                "user",
-                """
-                Konteks dari dokumen hukum:
-                
-                {context}
-                
-                ---
-                
-                Pertanyaan: {question}
-                
-                Berikan jawaban yang lengkap dan akurat berdasarkan konteks di atas.
-                """
-            )
-        ])
-
-        return prompt
+        return _ANSWER_PROMPT
         
     def generate_answer(self, query: str, limit: int = 5):
         raise NotImplementedError
+
+    async def agenerate_answer(self, query: str, limit: int = 5) -> Dict:
+        # Retrieval and the LLM call are both blocking, so the whole answer runs on a worker thread
+        return await asyncio.to_thread(self.generate_answer, query, limit)
+
+    async def agenerate_answers(self, queries: List[str], limit: int = 5, max_concurrency: int = 8) -> List[Dict]:
+        """Answer many questions with up to max_concurrency LLM calls in flight, results in query order"""
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def bounded(query: str) -> Dict:
+            async with semaphore:
+                return await self.agenerate_answer(query, limit)
+
+        return await asyncio.gather(*(bounded(query) for query in queries))
         
         
\ No newline at end of file
@@ -10,7 +10,7 @@ class RecursiveGenerator(BaseGenerator):
         super().__init__(database, llm, search_strategy)
         
     def generate_answer(self, query: str, limit: int = 5):
-        relevant_chunks = self.search_strategy.search(self.database, query, limit)
+        relevant_chunks = self.search(query, limit)
         if not relevant_chunks:
             return {
                 "answer": "Maaf, saya tidak menemukan informasi yang relevan dalam dokumen hukum.",
@@ -18,21 +18,22 @@ class RecursiveGenerator(BaseGenerator):
             }
         
         Logger.log(f"Found {len(relevant_chunks)} relevant chunks for query: '{query}'")
-        Logger.log(f"Relevant chunks: {relevant_chunks}")
+        Logger.debug("Relevant chunk ids: %s", [chunk.id for chunk in relevant_chunks])
         
         context_parts = []
         sources = []
         
-        for idx, chunk in enumerate(relevant_chunks):
+        for chunk in relevant_chunks:
             payload = chunk.payload
-            context_parts.append(payload['full_text'])
+            full_text = payload['full_text']
+            context_parts.append(full_text)
             sources.append({
                 "source": payload['source'],
                 "page": payload['page'],
                 "page_label": payload['page_label'],
                 "total_pages": payload['total_pages'],
                 "score": chunk.score,
-                "content": payload['full_text']
+                "content": full_text
             }) 
         
         context = "\n---\n".join(context_parts)
@@ -47,7 +48,7 @@ class RecursiveGenerator(BaseGenerator):
                 "sources": sources,
                 "query": query
             }
-            Logger.log(f"Jawaban berhasil di-generate untuk query: {payload}")
+            Logger.log(f"Jawaban berhasil di-generate untuk query: {len(answer)} karakter, {len(sources)} sumber")
             
             return payload
         
@@ -4,6 +4,55 @@ from llm import BaseLLM
 from rag.search_strategy import SearchStrategy
 from .base import BaseGenerator
 from qdrant_client.models import ScoredPoint
+from langchain_core.prompts import ChatPromptTemplate
+
+# Static, so built once at import instead of on every question
+_SEMANTIC_ANSWER_PROMPT = ChatPromptTemplate.from_messages([
+    (
+        "system",
+        """
+        Anda adalah asisten hukum AI yang membantu menjawab pertanyaan tentang dokumen hukum Indonesia.
+        Anda bekerja dengan chunk semantik yang telah dikelompokkan berdasarkan makna dan konteks.
+        
+        Keunggulan chunk semantik:
+        - Chunk dibuat berdasarkan batas-batas makna alami dalam teks
+        - Setiap chunk memiliki koherensi konteks yang kuat
+        - Informasi terkait dikelompokkan dalam chunk yang sama
+        
+        Tugas Anda:
+        1. Berikan jawaban yang akurat berdasarkan konteks dokumen hukum yang diberikan
+        2. Manfaatkan koherensi semantik dalam chunk untuk memberikan jawaban yang lebih utuh
+        3. Jika informasi tidak ada dalam konteks, katakan dengan jelas
+        4. Gunakan bahasa formal dan profesional
+        5. Sebutkan pasal, undang-undang, atau referensi hukum yang spesifik jika ada
+        6. Jelaskan hubungan antar konsep hukum jika relevan
+        
+        Format jawaban:
+        - Mulai dengan jawaban langsung
+        - Berikan penjelasan detail dengan memanfaatkan konteks semantik
+        - Sebutkan dasar hukum atau sumber yang relevan
+        - Jika ada ketidakpastian, sebutkan dengan jelas
+        
+        PENTING: Gunakan informasi dari konteks semantik yang diberikan dan manfaatkan 
+        keterkaitan makna antar bagian teks untuk memberikan jawaban yang komprehensif.
+        """
+    ),
+    (
+        "user",
+        """
+        Konteks dari dokumen hukum (chunk semantik):
+        
+        {context}
+        
+        ---
+        
+        Pertanyaan: {question}
+        
+        Berikan jawaban yang lengkap dan akurat berdasarkan konteks semantik di atas.
+        """
+    )
+])
+
 
 class SemanticGenerator(BaseGenerator):
     def __init__(self, database: VectorStore, llm: BaseLLM, search_strategy: SearchStrategy):
@@ -11,7 +60,7 @@ class SemanticGenerator(BaseGenerator):
         
     def generate_answer(self, query: str, limit: int = 5):
         try:
-            relevant_chunks = self.search_strategy.search(self.database, query, limit)
+            relevant_chunks = self.search(query, limit)
             
             if not relevant_chunks:
                 return {
@@ -25,9 +74,10 @@ class SemanticGenerator(BaseGenerator):
             context_parts = []
             sources = []
             
-            for idx, chunk in enumerate(relevant_chunks):
+            for chunk in relevant_chunks:
                 payload = chunk.payload
-                context_parts.append(payload['full_text'])
+                full_text = payload['full_text']
+                context_parts.append(full_text)
                 
                 # Build source info with semantic-specific metadaxta
                 source_info = {
@@ -38,7 +88,7 @@ class SemanticGenerator(BaseGenerator):
                     "score": chunk.score,
                     "chunk_id": payload.get('chunk_id', chunk.id),
                     "chunk_type": payload.get('chunk_type', 'semantic'),
-                    "content": payload['full_text']
+                    "content": full_text
                 }
                 
                 if 'semantic_score' in payload:
@@ -79,52 +129,4 @@ class SemanticGenerator(BaseGenerator):
         """
         Generate enhanced prompt specifically for semantic chunks
         """
-        from langchain_core.prompts import ChatPromptTemplate
-        
-        prompt = ChatPromptTemplate.from_messages([
-            (
-                "system",
-                """
-                Anda adalah asisten hukum AI yang membantu menjawab pertanyaan tentang dokumen hukum Indonesia.
-                Anda bekerja dengan chunk semantik yang telah dikelompokkan berdasarkan makna dan konteks.
-                
-                Keunggulan chunk semantik:
-                - Chunk dibuat berdasarkan batas-batas makna alami dalam teks
-                - Setiap chunk memiliki koherensi konteks yang kuat
-                - Informasi terkait dikelompokkan dalam chunk yang sama
-                
-                Tugas Anda:
-                1. Berikan jawaban yang akurat berdasarkan konteks dokumen hukum yang diberikan
-                2. Manfaatkan koherensi semantik dalam chunk untuk memberikan jawaban yang lebih utuh
-                3. Jika informasi tidak ada dalam konteks, katakan dengan jelas
-                4. Gunakan bahasa formal dan profesional
-                5. Sebutkan pasal, undang-undang, atau referensi hukum yang spesifik jika ada
-                6. Jelaskan hubungan antar konsep hukum jika relevan
-                
-                Format jawaban:
-                - Mulai dengan jawaban langsung
-                - Berikan penjelasan detail dengan memanfaatkan konteks semantik
-                - Sebutkan dasar hukum atau sumber yang relevan
-                - Jika ada ketidakpastian, sebutkan dengan jelas
-                
-                PENTING: Gunakan informasi dari konteks semantik yang diberikan dan manfaatkan 
-                keterkaitan makna antar bagian teks untuk memberikan jawaban yang komprehensif.
-                """
-            ),
-            (
-                "user",
-                """
-                Konteks dari dokumen hukum (chunk semantik):
-                
-                {context}
-                
-                ---
-                
-                Pertanyaan: {question}
-                
-                Berikan jawaban yang lengkap dan akurat berdasarkan konteks semantik di atas.
-                """
-            )
-        ])
-
-        return prompt
\ No newline at end of file
+        return _SEMANTIC_ANSWER_PROMPT
\ No newline at end of file
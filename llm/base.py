@@ -1,7 +1,12 @@
 from langchain_core.prompts.chat import ChatPromptTemplate
 from typing import Dict
+import threading
 import time
 
+# Bound on cached prompt | model chains; prompts here are module constants, so it only matters
+# for callers that build a new prompt per call
+_MAX_CACHED_RUNNABLES = 32
+
 class BaseLLM:
     def __init__(self, model_name: str, api_key: str):
         self.model_name = model_name
@@ -9,9 +14,22 @@ class BaseLLM:
             raise ValueError("API key must be provided.")
         self.api_key = api_key
         self.model = self._initialize_llm()
+        # id(prompt) -> (prompt, prompt | model); holding the prompt keeps its id from being reused
+        self._runnables: Dict[int, tuple] = {}
+        self._runnables_lock = threading.Lock()
+
+    def _runnable(self, PROMPT: ChatPromptTemplate):
+        """PROMPT | self.model, composed once per prompt object"""
+        entry = self._runnables.get(id(PROMPT))
+        if entry is None:
+            with self._runnables_lock:
+                if len(self._runnables) >= _MAX_CACHED_RUNNABLES:
+                    self._runnables.clear()
+                entry = self._runnables.setdefault(id(PROMPT), (PROMPT, PROMPT | self.model))
+        return entry[1]
 
     def answer(self, PROMPT: ChatPromptTemplate, input : Dict, max_retries: int = 3) -> str:
-        runnable = PROMPT | self.model
+        runnable = self._runnable(PROMPT)
         
         for attempt in range(max_retries):
             try:
@@ -25,6 +43,6 @@ class BaseLLM:
                 else:
                     print(f"[ERROR] LLM request failed after {max_retries} attempts")
                     raise
-        
+
     def _initialize_llm(self):
         raise NotImplementedError("Subclasses must implement this method.")
\ No newline at end of file
@@ -1,10 +1,15 @@
-import re
+import asyncio
+from typing import Awaitable, Iterable, List
+from langchain_core.documents import Document
 from langchain_community.document_loaders import PyPDFLoader, PyMuPDFLoader
 from pypdf.errors import PdfStreamError
 from logger import Logger
 
 
 class BaseLoader:
+    # Upper bound on PDFs parsed at once, keeps open file handles in check
+    max_concurrent_files = 8
+
     def __init__(self, source: str):
         self.source = source
         self.pages = []
@@ -16,28 +21,43 @@ class BaseLoader:
         # Remove common headers/footers (simple string replace)
         text = text.replace('PRESIDEN REPUBLIK INDONESIA', '')
         
-        # Normalize excessive whitespace
-        text = '\n'.join(line.rstrip() for line in text.split('\n'))
-        text = '\n'.join(line for line in text.split('\n') if line.strip())
-        
-        # Collapse multiple newlines
-        while '\n\n\n' in text:
-            text = text.replace('\n\n\n', '\n\n')
+        # Strip trailing whitespace and drop blank lines in a single pass over the lines
+        # (with no blank lines left there are no runs of newlines to collapse)
+        text = '\n'.join(stripped for line in text.split('\n') if (stripped := line.rstrip()))
         
         return text.strip()
     
+    def _clean_pages(self, pages: List[Document]):
+        for page in pages:
+            page.page_content = self._clean_text(page.page_content)
+    
     def load_data(self):
         raise NotImplementedError
 
-    async def _load_single_pdf(self, file_path: str, file_name: str):
-        """Load a single PDF file"""
+    async def _gather_pages(self, file_loads: Iterable[Awaitable[List[Document]]]):
+        """Run the per-file loads concurrently and add their pages in file order"""
+        semaphore = asyncio.Semaphore(self.max_concurrent_files)
+
+        async def bounded(file_load):
+            async with semaphore:
+                return await file_load
+
+        results = await asyncio.gather(*(bounded(file_load) for file_load in file_loads), return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                Logger.log(f"PDF load failed: {result}")
+            elif result:
+                self.pages.extend(result)
+
+    async def _load_single_pdf(self, file_path: str, file_name: str) -> List[Document]:
+        """Load and clean the pages of a single PDF file"""
         try:
             Logger.log(f"Loading: {file_name}")
             
             with open(file_path, 'rb') as f:
                 header = f.read(8)
                 if not header.startswith(b'%PDF'):
-                    return
+                    return []
             
             loader = PyPDFLoader(file_path)
             pages_loaded = []
@@ -46,12 +66,12 @@ class BaseLoader:
             try:
                 async for page in loader.alazy_load():
                     page_count += 1
-                    Logger.log(f"  Page {page_count} loaded, cleaning text...")
-                    page.page_content = self._clean_text(page.page_content)
-                    Logger.log(f"  Page {page_count} cleaned")
+                    Logger.debug("  Page %d loaded", page_count)
                     pages_loaded.append(page)
-                self.pages.extend(pages_loaded)
+                # Clean the whole file in one worker-thread call, keeping the event loop free for other files
+                await asyncio.to_thread(self._clean_pages, pages_loaded)
                 Logger.log(f"✓ Loaded {len(pages_loaded)} pages from {file_name}")
+                return pages_loaded
                 
             except Exception as async_error:
                 Logger.log(f"Async loading failed for {file_name}: {async_error}")
@@ -62,4 +82,5 @@ class BaseLoader:
             self._try_pymupdf_fallback(file_path, file_name)
             
         except Exception as e:
-            Logger.log(f"Unexpected error on {file_name}: {e}")
\ No newline at end of file
+            Logger.log(f"Unexpected error on {file_name}: {e}")
+        return []
\ No newline at end of file
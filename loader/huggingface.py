@@ -1,10 +1,8 @@
 from langchain_community.document_loaders import PyPDFLoader, PyMuPDFLoader
 from pypdf.errors import PdfStreamError
-import os
-import tempfile
-import shutil
 import asyncio
-from huggingface_hub import list_repo_files, hf_hub_download
+import os
+from huggingface_hub import snapshot_download
 from logger import Logger
 from .base import BaseLoader
 
@@ -26,43 +24,29 @@ class HuggingFacePDFLoader(BaseLoader):
         repo_type_to_try = "dataset" 
 
         try:
-            Logger.log(f"[LOG] Attempting to list files from repo as type: '{repo_type_to_try}'")
-            files = list_repo_files(self.source, repo_type=repo_type_to_try, token=self.hf_token)
+            Logger.log(f"[LOG] Downloading PDFs from repo as type: '{repo_type_to_try}'")
+            # One snapshot call lists the repo and fetches every PDF on the hub client's own
+            # thread pool; files already in the HF cache are not downloaded again
+            local_dir = await asyncio.to_thread(
+                snapshot_download,
+                repo_id=self.source,
+                repo_type=repo_type_to_try,
+                token=self.hf_token,
+                allow_patterns=["*.[pP][dD][fF]"],
+                max_workers=self.max_concurrent_files
+            )
             
-            pdf_files = [f for f in files if f.lower().endswith('.pdf')]
+            pdf_files = sorted(
+                os.path.relpath(os.path.join(root, name), local_dir)
+                for root, _, names in os.walk(local_dir)
+                for name in names
+                if name.lower().endswith('.pdf')
+            )
             Logger.log(f"[LOG] Found {len(pdf_files)} PDF files in repository")
             
-            for pdf_file in pdf_files:
-                temp_path = None
-                try:
-                    downloaded_path = hf_hub_download(
-                        repo_id=self.source,
-                        filename=pdf_file,
-                        token=self.hf_token,
-                        repo_type=repo_type_to_try 
-                    )
-                    
-                    with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_file:
-                        temp_path = temp_file.name
-                    
-                    shutil.copy2(downloaded_path, temp_path)
-                    
-                    await self._load_single_pdf(temp_path, pdf_file)
-                    
-                    await asyncio.sleep(0.01)
-                    
-                except Exception as e:
-                    Logger.log(f"Failed to download or process {pdf_file}: {e}")
-                finally:
-                    if temp_path and os.path.exists(temp_path):
-                        try:
-                            os.unlink(temp_path)
-                        except PermissionError:
-                            await asyncio.sleep(0.1)
-                            try:
-                                os.unlink(temp_path)
-                            except Exception as cleanup_error:
-                                Logger.log(f"Warning: Could not clean up temp file {temp_path}: {cleanup_error}")
+            await self._gather_pages(
+                self._load_single_pdf(os.path.join(local_dir, pdf_file), pdf_file) for pdf_file in pdf_files
+            )
                     
         except Exception as e:
             Logger.log(f"CRITICAL: Failed to access Hugging Face repository: {e}")
@@ -15,12 +15,11 @@ class LocalPDFLoader(BaseLoader):
     async def load_data(self):
         Logger.log(f"[LOG] Loading PDFs from local folder: {self.source}")
 
-        for file_name in os.listdir(self.source):
-            file_path = os.path.join(self.source, file_name)
-            if not file_name.lower().endswith(".pdf"):
-                continue
-
-            await self._load_single_pdf(file_path, file_name)
+        await self._gather_pages(
+            self._load_single_pdf(os.path.join(self.source, file_name), file_name)
+            for file_name in os.listdir(self.source)
+            if file_name.lower().endswith(".pdf")
+        )
     
     
         
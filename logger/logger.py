@@ -1,7 +1,57 @@
-from datetime import datetime
+import atexit
+import sys
+import threading
+import time
+from typing import List
+
+# A buffered batch is written as soon as it reaches this many characters
+_FLUSH_CHARS = 64 * 1024
 
 class Logger:
     enabled: bool = True
+    debug_enabled: bool = False
+    # Formatted timestamp of the last logged second, reused by every message within that second
+    _stamp_second: int = -1
+    _stamp: str = ""
+    # With buffering on, lines are collected here and written in batches
+    buffered: bool = False
+    _buffer: List[str] = []
+    _buffer_chars: int = 0
+    _buffer_lock = threading.Lock()
+    _flusher_started: bool = False
+    
+    @staticmethod
+    def enable_buffering(interval: float = 0.5) -> None:
+        """Write log lines in batches, at least every `interval` seconds, instead of one write per line"""
+        Logger.buffered = True
+        with Logger._buffer_lock:
+            if Logger._flusher_started:
+                return
+            Logger._flusher_started = True
+        
+        def flush_periodically():
+            while True:
+                time.sleep(interval)
+                Logger.flush()
+        
+        threading.Thread(target=flush_periodically, name="logger-flush", daemon=True).start()
+    
+    @staticmethod
+    def disable_buffering() -> None:
+        Logger.buffered = False
+        Logger.flush()
+    
+    @staticmethod
+    def flush() -> None:
+        """Write out every buffered line"""
+        with Logger._buffer_lock:
+            if not Logger._buffer:
+                return
+            text = "".join(Logger._buffer)
+            Logger._buffer.clear()
+            Logger._buffer_chars = 0
+            sys.stdout.write(text)
+        sys.stdout.flush()
     
     @staticmethod
     def disable() -> None:
@@ -12,7 +62,41 @@ class Logger:
         Logger.enabled = True
     
     @staticmethod
-    def log(message: str) -> None:
+    def enable_debug() -> None:
+        Logger.debug_enabled = True
+    
+    @staticmethod
+    def disable_debug() -> None:
+        Logger.debug_enabled = False
+    
+    @staticmethod
+    def log(message: str, *args) -> None:
+        """Log a message; with args, message is a %-format string only formatted when logging is enabled"""
         if Logger.enabled:
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            print(f"[{timestamp}] {message}")
\ No newline at end of file
+            if args:
+                message = message % args
+            second = int(time.time())
+            if second != Logger._stamp_second:
+                Logger._stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(second))
+                Logger._stamp_second = second
+            line = f"[{Logger._stamp}] {message}\n"
+            if Logger.buffered:
+                with Logger._buffer_lock:
+                    Logger._buffer.append(line)
+                    Logger._buffer_chars += len(line)
+                    full = Logger._buffer_chars >= _FLUSH_CHARS
+                if full:
+                    Logger.flush()
+                return
+            # One write per line, so lines from concurrent threads don't interleave
+            sys.stdout.write(line)
+    
+    @staticmethod
+    def debug(message: str, *args) -> None:
+        """Per-item detail for hot loops, dropped (without formatting) unless debug logging is enabled"""
+        if Logger.enabled and Logger.debug_enabled:
+            Logger.log(message, *args)
+
+
+# Lines still buffered when the interpreter exits are not lost
+atexit.register(Logger.flush)
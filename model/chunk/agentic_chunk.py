@@ -6,17 +6,27 @@ class AgenticChunk(BaseChunk):
     propositions : list[str]
     index : int
     
+    @staticmethod
+    def format_context(title: str, summary: str, propositions: list[str]) -> str:
+        content = "\n".join(propositions)
+        return f"Judul: {title}\nRingkasan: {summary}\n\nKonten:\n{content}"
+    
+    @classmethod
+    def context_from_payload(cls, payload: dict) -> str:
+        """Context of a stored agentic payload; full_text is only present in older collections"""
+        if 'full_text' in payload:
+            return payload['full_text']
+        return cls.format_context(payload.get('title', ''), payload.get('summary', ''), payload.get('propositions', []))
+    
     def get_context(self) -> str:
-        content = "\n".join(self.propositions)
-        return f"Judul: {self.title}\nRingkasan: {self.summary}\n\nKonten:\n{content}"
+        return self.format_context(self.title, self.summary, self.propositions)
     
     def get_payload(self) -> dict:
+        # full_text is left out: it only repeats title, summary and propositions
         return {
             "chunk_id": self.id,
             "title": self.title,
             "summary": self.summary,
             "propositions": self.propositions,
-            "full_text": self.get_context(),
             "index": self.index
         }
-    
\ No newline at end of file
@@ -1,10 +1,33 @@
 from dataclasses import dataclass
-from typing import Dict, Any
+from typing import Dict, Any, List
 import numpy as np
 
 
-@dataclass
+@dataclass(slots=True)
 class Point:
     id: str
     vector: np.ndarray
     payload: Dict[str, Any]
+
+    def __post_init__(self):
+        # C-contiguous float32 is what the stores consume, so they never copy it again
+        # (a no-op for arrays that already are); named vectors are left as given
+        if not isinstance(self.vector, dict):
+            self.vector = np.ascontiguousarray(self.vector, dtype=np.float32)
+
+    @property
+    def dense_vector(self) -> np.ndarray:
+        return self.vector["dense"] if isinstance(self.vector, dict) else self.vector
+
+    def to_bytes(self) -> bytes:
+        return np.asarray(self.dense_vector, dtype=np.float32).tobytes()
+
+    @staticmethod
+    def bulk_vectors(points: List["Point"]) -> np.ndarray:
+        """(N, d) float32 matrix of the points' dense vectors, written row by row into one allocation"""
+        if not points:
+            return np.empty((0, 0), dtype=np.float32)
+        matrix = np.empty((len(points), len(points[0].dense_vector)), dtype=np.float32)
+        for row, point in enumerate(points):
+            matrix[row] = point.dense_vector
+        return matrix
@@ -1,7 +1,13 @@
-from pydantic import BaseModel
+from dataclasses import dataclass
 from typing import Any, Dict
 
-class SearchResult(BaseModel):
+
+# A plain container built for every hit; nothing here needs validation
+@dataclass(slots=True)
+class SearchResult:
     id: str
     payload: Dict[str, Any]
     score: float
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"id": self.id, "payload": self.payload, "score": self.score}
@@ -1,4 +1,6 @@
 from typing import Optional, Dict, Any
+import asyncio
+import time
 from database.base import VectorStore
 from generator.base import BaseGenerator
 from chunker.base import BaseChunker
@@ -6,6 +8,11 @@ from loader.base import BaseLoader
 from llm.base import BaseLLM
 from rag.search_strategy import SearchStrategy
 from logger import Logger
+from utils.semantic_cache import SemanticCache
+from utils.model_registry import encode_query
+
+# Seconds a get_database_info result is reused; with Qdrant each fresh one is a network round-trip
+_INFO_TTL = 5.0
 
 
 class RAGPipeline:
@@ -24,7 +31,10 @@ class RAGPipeline:
         search_strategy: SearchStrategy,
         generator: BaseGenerator,
         chunker: Optional[BaseChunker] = None,
-        loader: Optional[BaseLoader] = None
+        loader: Optional[BaseLoader] = None,
+        answer_cache_size: int = 0,
+        answer_cache_threshold: float = 0.97,
+        answer_cache_ttl: float = 300.0
     ):
         """
         Initialize RAG Pipeline
@@ -36,6 +46,9 @@ class RAGPipeline:
             generator: Generator instance for creating answers
             chunker: Optional chunker for processing documents
             loader: Optional loader for reading documents
+            answer_cache_size: Recent answers kept for near-identical questions (0 disables it)
+            answer_cache_threshold: Cosine similarity at which a cached answer is reused
+            answer_cache_ttl: Seconds a cached answer stays valid
         """
         self.database = database
         self.llm = llm
@@ -43,6 +56,10 @@ class RAGPipeline:
         self.generator = generator
         self.chunker = chunker
         self.loader = loader
+        # Keyed by the database's dense embedding of the question, so it needs a store with a dense_model
+        self.answer_cache = SemanticCache(answer_cache_size, answer_cache_threshold, answer_cache_ttl)
+        # (time fetched, info) of the last get_database_info call
+        self._info_cache: Optional[tuple] = None
         
         Logger.log(f"RAG Pipeline initialized with:")
         Logger.log(f"  - Database: {database.__class__.__name__}")
@@ -76,12 +93,16 @@ class RAGPipeline:
             await self.loader.load_data()
             Logger.log(f"Loaded {len(self.loader.pages)} pages")
             
-            # Chunk documents
-            self.chunker.load_data_to_chunks(self.loader.pages)
+            # Chunk documents; CPU/LLM-bound, so it runs in a worker thread to keep the event loop free
+            await asyncio.to_thread(self.chunker.load_data_to_chunks, self.loader.pages)
             Logger.log(f"Created {len(self.chunker.chunks)} chunks")
             
-            # Store in database
-            self.database.store_chunks(self.chunker.chunks)
+            # Store in database; the stores batch and pipeline encoding/upserts themselves, so the
+            # whole dict goes in one call, run off the event loop
+            await asyncio.to_thread(self.database.store_chunks, self.chunker.chunks)
+            self.generator.clear_search_cache()
+            self.answer_cache.clear()
+            self._info_cache = None
             Logger.log(f"Stored chunks in {self.database.__class__.__name__}")
             
             Logger.log("Document ingestion completed successfully!")
@@ -104,7 +125,12 @@ class RAGPipeline:
         """
         try:
             Logger.log(f"Processing query: {question}")
+            vector = self._embed_question(question)
+            cached = self._cached_answer(vector, limit)
+            if cached is not None:
+                return cached
             result = self.generator.generate_answer(question, limit)
+            self._remember_answer(vector, result, limit)
             Logger.log(f"Query processed successfully")
             return result
             
@@ -117,6 +143,57 @@ class RAGPipeline:
                 "error": str(e)
             }
     
+    async def query_async(self, question: str, limit: int = 5) -> Dict[str, Any]:
+        """
+        Async version of query, so several questions can be answered concurrently
+        
+        Args:
+            question: User's question
+            limit: Number of chunks to retrieve
+            
+        Returns:
+            Dict containing answer, sources, and metadata
+        """
+        try:
+            Logger.log(f"Processing query: {question}")
+            vector = await asyncio.to_thread(self._embed_question, question)
+            cached = self._cached_answer(vector, limit)
+            if cached is not None:
+                return cached
+            result = await self.generator.agenerate_answer(question, limit)
+            self._remember_answer(vector, result, limit)
+            Logger.log(f"Query processed successfully")
+            return result
+            
+        except Exception as e:
+            Logger.log(f"Error processing query: {e}")
+            return {
+                "answer": f"Maaf, terjadi error saat memproses pertanyaan: {str(e)}",
+                "sources": [],
+                "query": question,
+                "error": str(e)
+            }
+    
+    def _embed_question(self, question: str):
+        """Normalized dense embedding of the question for the answer cache, or None when it is off"""
+        dense_model = getattr(self.database, "dense_model", None)
+        if self.answer_cache.maxsize <= 0 or dense_model is None:
+            return None
+        return encode_query(dense_model, question)
+    
+    def _cached_answer(self, vector, limit: int) -> Optional[Dict[str, Any]]:
+        if vector is None:
+            return None
+        cached = self.answer_cache.get(vector, limit)
+        if cached is None:
+            return None
+        Logger.log("Answer reused from a near-identical earlier question")
+        return cached[0]
+    
+    def _remember_answer(self, vector, result: Dict[str, Any], limit: int):
+        if vector is not None and "error" not in result:
+            self.answer_cache.put(vector, [result], limit)
+    
     def get_database_info(self) -> Dict[str, Any]:
         """
         Get information about the database
@@ -124,8 +201,13 @@ class RAGPipeline:
         Returns:
             Dict containing database information
         """
+        now = time.monotonic()
+        if self._info_cache is not None and now - self._info_cache[0] < _INFO_TTL:
+            return self._info_cache[1]
         try:
-            return self.database.get_info()
+            info = self.database.get_info()
+            self._info_cache = (now, info)
+            return info
         except Exception as e:
             Logger.log(f"Error getting database info: {e}")
             return {"error": str(e)}
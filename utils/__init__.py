@@ -0,0 +1,7 @@
+from .json_parser import parse_json_response
+from .embedding_cache import EmbeddingCache
+from .llm_cache import SemanticLLMCache
+from .model_registry import get_sentence_transformer, encode_adaptive, encode_query, embedding_variant
+from .semantic_cache import SemanticCache
+
+__all__ = ["parse_json_response", "EmbeddingCache", "SemanticLLMCache", "get_sentence_transformer", "encode_adaptive", "encode_query", "embedding_variant", "SemanticCache"]
@@ -0,0 +1,121 @@
+from collections import OrderedDict
+from typing import Callable, Dict, List
+import hashlib
+import os
+import sqlite3
+import threading
+import numpy as np
+
+# Keeps IN (...) lists below SQLite's bound-parameter limit
+_SQLITE_BATCH = 500
+
+
+class EmbeddingCache:
+    """Two-level cache of text embeddings: an in-process LRU in front of a SQLite table.
+
+    Vectors are keyed by (model key, BLAKE2b of the text), so one database file can be
+    shared by every component that embeds with the same model, and hits accumulate across runs.
+    The model key is "name|backend|precision" (see model_registry.embedding_variant), so fp32,
+    half-precision and int8 vectors of one model are kept apart.
+    """
+
+    def __init__(self, db_path: str, model_name: str, maxsize: int = 50_000):
+        self.db_path = db_path
+        self.model_name = model_name
+        self.maxsize = maxsize
+        self._memory: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, text_hash BLOB NOT NULL, vector BLOB NOT NULL, "
+            "PRIMARY KEY (model, text_hash))"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def _hash(text: str) -> bytes:
+        return hashlib.blake2b(text.encode(), digest_size=16).digest()
+
+    def encode(self, texts: List[str], encode_fn: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """Return a (len(texts), d) float32 matrix, calling encode_fn only for texts never seen before"""
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+
+        keys = [self._hash(text) for text in texts]
+        vectors: List[np.ndarray] = [None] * len(texts)
+        missing: List[int] = []
+
+        with self._lock:
+            not_in_memory = []
+            for i, key in enumerate(keys):
+                vector = self._memory.get(key)
+                if vector is None:
+                    not_in_memory.append(i)
+                else:
+                    self._memory.move_to_end(key)
+                    vectors[i] = vector
+
+            if not_in_memory:
+                stored = self._fetch({keys[i] for i in not_in_memory})
+                for i in not_in_memory:
+                    vector = stored.get(keys[i])
+                    if vector is None:
+                        missing.append(i)
+                    else:
+                        vectors[i] = vector
+                        self._remember(keys[i], vector)
+
+        if missing:
+            # Encode each distinct text once, even if it repeats within the batch
+            unique: Dict[bytes, str] = {}
+            for i in missing:
+                unique.setdefault(keys[i], texts[i])
+            encoded = np.asarray(encode_fn(list(unique.values())), dtype=np.float32)
+            fresh = dict(zip(unique.keys(), encoded))
+
+            with self._lock:
+                self._store(fresh)
+                for key, vector in fresh.items():
+                    self._remember(key, vector)
+            for i in missing:
+                vectors[i] = fresh[keys[i]]
+
+        return np.stack(vectors)
+
+    def _remember(self, key: bytes, vector: np.ndarray):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.maxsize:
+            self._memory.popitem(last=False)
+
+    def _fetch(self, keys) -> Dict[bytes, np.ndarray]:
+        keys = list(keys)
+        found: Dict[bytes, np.ndarray] = {}
+        for start in range(0, len(keys), _SQLITE_BATCH):
+            batch = keys[start:start + _SQLITE_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._conn.execute(
+                f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                [self.model_name, *batch]
+            )
+            for text_hash, blob in rows:
+                found[text_hash] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def _store(self, vectors: Dict[bytes, np.ndarray]):
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (model, text_hash, vector) VALUES (?, ?, ?)",
+            [(self.model_name, key, np.ascontiguousarray(vector, dtype=np.float32).tobytes()) for key, vector in vectors.items()]
+        )
+        self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,34 @@
+from logger import Logger
+from pydantic import BaseModel, ValidationError
+from typing import Optional, Type, TypeVar
+import re
+
+T = TypeVar("T", bound=BaseModel)
+
+# Leading ``` / ```json fence and trailing ``` fence, removed in a single pass
+_FENCE_RE = re.compile(rb"\A\s*```(?:json)?\s*|\s*```\s*\Z", re.S)
+
+
+def parse_json_response(result: str, model: Type[T]) -> Optional[T]:
+    """Parse an LLM reply into `model`, tolerating code fences or chatter around the JSON"""
+    if not result:
+        return None
+    
+    # Encoded once; the fallback slices these bytes instead of re-encoding a substring
+    cleaned = _FENCE_RE.sub(b"", result.encode())
+    try:
+        return model.model_validate_json(cleaned)
+    except ValidationError:
+        pass
+    
+    # Fall back to the outermost JSON object when the model wrapped it in prose
+    start = cleaned.find(b"{")
+    end = cleaned.rfind(b"}")
+    if start != -1 and end > start:
+        try:
+            return model.model_validate_json(cleaned[start:end + 1])
+        except ValidationError:
+            pass
+    
+    Logger.log(f"Failed to parse JSON response: {result[:200]}")
+    return None
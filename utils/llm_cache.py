@@ -0,0 +1,122 @@
+from typing import Callable, Dict, List, Optional
+import hashlib
+import os
+import sqlite3
+import threading
+import numpy as np
+
+
+class SemanticLLMCache:
+    """Persistent cache of LLM responses keyed by prompt template and input variables.
+
+    Lookups try an exact match on the variables first. When an embed_fn is given, they fall back
+    to the most similar earlier input of the same template (cosine >= threshold), so near-identical
+    prompts such as the same proposition with slightly different wording are answered from disk.
+    """
+
+    def __init__(self, db_path: str, model_name: str,
+                 embed_fn: Optional[Callable[[List[str]], np.ndarray]] = None,
+                 threshold: float = 0.97):
+        self.db_path = db_path
+        self.model_name = model_name
+        self.embed_fn = embed_fn
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        # template id -> (normalized input embeddings, matching input hashes), loaded on first use
+        self._vectors: Dict[str, np.ndarray] = {}
+        self._vector_keys: Dict[str, List[bytes]] = {}
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "model TEXT NOT NULL, template TEXT NOT NULL, input_hash BLOB NOT NULL, "
+            "response TEXT NOT NULL, embedding BLOB, "
+            "PRIMARY KEY (model, template, input_hash))"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def _input_text(inputs: Dict) -> str:
+        return "\n".join(str(inputs[key]) for key in sorted(inputs))
+
+    @staticmethod
+    def _hash(text: str) -> bytes:
+        return hashlib.blake2b(text.encode(), digest_size=16).digest()
+
+    def answer(self, template_id: str, inputs: Dict, call: Callable[[], str], semantic: bool = True) -> str:
+        """Return the cached response for these inputs, or call the LLM and remember its answer.
+
+        Pass semantic=False for prompts whose answer must not be reused for merely similar inputs.
+        """
+        text = self._input_text(inputs)
+        key = self._hash(text)
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM responses WHERE model = ? AND template = ? AND input_hash = ?",
+                (self.model_name, template_id, key)
+            ).fetchone()
+        if row is not None:
+            return row[0]
+
+        vector = None
+        if semantic and self.embed_fn is not None:
+            vector = np.asarray(self.embed_fn([text])[0], dtype=np.float32)
+            cached = self._most_similar(template_id, vector)
+            if cached is not None:
+                return cached
+
+        response = call()
+        self._store(template_id, key, response, vector)
+        return response
+
+    def _most_similar(self, template_id: str, vector: np.ndarray) -> Optional[str]:
+        with self._lock:
+            self._load_vectors(template_id)
+            matrix = self._vectors[template_id]
+            if not len(matrix):
+                return None
+            scores = matrix @ vector
+            best = int(np.argmax(scores))
+            if float(scores[best]) < self.threshold:
+                return None
+            row = self._conn.execute(
+                "SELECT response FROM responses WHERE model = ? AND template = ? AND input_hash = ?",
+                (self.model_name, template_id, self._vector_keys[template_id][best])
+            ).fetchone()
+        return row[0] if row is not None else None
+
+    def _load_vectors(self, template_id: str):
+        if template_id in self._vectors:
+            return
+        rows = self._conn.execute(
+            "SELECT input_hash, embedding FROM responses WHERE model = ? AND template = ? AND embedding IS NOT NULL",
+            (self.model_name, template_id)
+        ).fetchall()
+        self._vector_keys[template_id] = [input_hash for input_hash, _ in rows]
+        if rows:
+            self._vectors[template_id] = np.stack([np.frombuffer(blob, dtype=np.float32) for _, blob in rows])
+        else:
+            self._vectors[template_id] = np.empty((0, 0), dtype=np.float32)
+
+    def _store(self, template_id: str, key: bytes, response: str, vector: Optional[np.ndarray]):
+        blob = vector.tobytes() if vector is not None else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (model, template, input_hash, response, embedding) VALUES (?, ?, ?, ?, ?)",
+                (self.model_name, template_id, key, response, blob)
+            )
+            self._conn.commit()
+            if vector is not None and template_id in self._vectors:
+                matrix = self._vectors[template_id]
+                self._vectors[template_id] = vector[None, :] if not len(matrix) else np.vstack([matrix, vector])
+                self._vector_keys[template_id].append(key)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,151 @@
+from functools import lru_cache
+from typing import List, Optional
+import os
+import weakref
+import numpy as np
+from sentence_transformers import SentenceTransformer
+from logger import Logger
+
+# SentenceTransformers' file name for avx512_vnni dynamic quantization, and where local exports go
+_INT8_ONNX_FILE = "onnx/model_qint8_avx512_vnni.onnx"
+_QUANTIZED_DIR = os.path.join(".", "model_cache", "onnx_int8")
+# Models loaded from an int8 ONNX file; their weights give no other hint of it
+_INT8_MODELS = weakref.WeakSet()
+
+
+def get_sentence_transformer(name: str, backend: str = "torch", device: Optional[str] = None,
+                             half_precision: bool = False) -> SentenceTransformer:
+    """Process-wide SentenceTransformer instances, one per (name, backend, device, precision).
+
+    The chunkers and vector stores usually embed with the same model; sharing the instance keeps a
+    single copy of the weights in RAM/VRAM and loads it once. Callers must treat it as shared state.
+    backend is "torch", "onnx", "openvino" or "onnx-int8" (dynamically quantized ONNX for CPU inference).
+    With half_precision, torch models placed on a GPU run in bfloat16 (fp16 where bf16 is unsupported).
+    It is off by default: the stores index and query in fp32, only SemanticChunker opts in.
+    """
+    # lru_cache keys on how arguments were passed, so normalize them before the cached call
+    return _load_sentence_transformer(name, backend, device, half_precision)
+
+
+@lru_cache(maxsize=8)
+def _load_sentence_transformer(name: str, backend: str, device: Optional[str], half_precision: bool) -> SentenceTransformer:
+    Logger.log(f"Loading SentenceTransformer: {name} (backend={backend})")
+    if backend == "onnx-int8":
+        model = _load_int8_onnx(name, device)
+        warm_up(model)
+        return model
+    model = SentenceTransformer(name, device=device, backend=backend)
+    if backend == "torch" and half_precision and model.device.type == "cuda":
+        import torch
+        dtype = torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16
+        model.to(dtype)
+        Logger.log(f"{name} running in {dtype}")
+    warm_up(model)
+    return model
+
+
+@lru_cache(maxsize=4096)
+def encode_query(model: SentenceTransformer, query: str) -> np.ndarray:
+    """Normalized float32 embedding of one query, cached per (model instance, query text).
+
+    Every store and pipeline sharing a registry model also shares these vectors, so a testset run
+    against many configurations embeds each question once. The array is read-only because it is shared.
+    """
+    vector = np.asarray(
+        model.encode(query, convert_to_numpy=True, normalize_embeddings=True, show_progress_bar=False),
+        dtype=np.float32
+    )
+    vector.flags.writeable = False
+    return vector
+
+
+def warm_up(model: SentenceTransformer):
+    """One tiny encode so lazy initialization (CUDA context, cuDNN autotuning, ONNX session setup)
+    happens at load time instead of delaying the first real batch or query"""
+    try:
+        model.encode(["warmup"], show_progress_bar=False)
+    except Exception as e:
+        Logger.log(f"Model warmup failed: {e}")
+
+
+def _cpu_has_vnni() -> bool:
+    try:
+        with open("/proc/cpuinfo") as f:
+            return "avx512_vnni" in f.read()
+    except OSError:
+        return False
+
+
+def _load_int8_onnx(name: str, device: Optional[str]) -> SentenceTransformer:
+    """Dynamically int8-quantized ONNX export of the model, run by ONNX Runtime.
+
+    Without AVX512-VNNI the int8 kernels are slower than fp32, so those CPUs get the plain ONNX model.
+    A quantized file published with the model is used as is, otherwise one is exported once under
+    _QUANTIZED_DIR and reused afterwards.
+    """
+    if not _cpu_has_vnni():
+        Logger.log("CPU has no AVX512-VNNI, using the fp32 ONNX model instead of int8")
+        return SentenceTransformer(name, device=device, backend="onnx")
+    
+    model_kwargs = {"file_name": _INT8_ONNX_FILE}
+    try:
+        model = SentenceTransformer(name, device=device, backend="onnx", model_kwargs=model_kwargs)
+    except Exception as e:
+        Logger.log(f"No published int8 ONNX model for {name} ({e}), quantizing locally")
+        save_dir = os.path.join(_QUANTIZED_DIR, name.replace("/", "__"))
+        if not os.path.exists(os.path.join(save_dir, _INT8_ONNX_FILE)):
+            from sentence_transformers import export_dynamic_quantized_onnx_model
+            model = SentenceTransformer(name, device=device, backend="onnx")
+            model.save(save_dir)
+            export_dynamic_quantized_onnx_model(model, "avx512_vnni", save_dir)
+        model = SentenceTransformer(save_dir, device=device, backend="onnx", model_kwargs=model_kwargs)
+    _INT8_MODELS.add(model)
+    return model
+
+
+def embedding_variant(model: SentenceTransformer) -> str:
+    """"backend|precision" of the vectors a model produces, e.g. "torch|float32", "torch|bfloat16", "onnx|int8".
+
+    One model name can yield vectors at several precisions, so caches of its embeddings key on this too.
+    """
+    backend = getattr(model, "backend", "torch")
+    if model in _INT8_MODELS:
+        return f"{backend}|int8"
+    if backend != "torch":
+        return f"{backend}|float32"
+    try:
+        precision = str(next(model.parameters()).dtype).replace("torch.", "")
+    except (AttributeError, StopIteration, TypeError):
+        precision = "float32"
+    return f"{backend}|{precision}"
+
+
+def _is_out_of_memory(error: BaseException) -> bool:
+    return isinstance(error, MemoryError) or "out of memory" in str(error).lower()
+
+
+def encode_adaptive(model: SentenceTransformer, texts: List[str], batch_size: int = 256, **kwargs) -> np.ndarray:
+    """model.encode to a numpy array, halving batch_size and retrying on out-of-memory errors.
+
+    SentenceTransformer encodes the longest texts first, so an oversized batch fails right at the
+    start and little work is repeated. On a GPU the embeddings stay on the device until every batch
+    is done and are copied to host memory once, instead of syncing the stream after each batch.
+    """
+    on_gpu = getattr(model.device, "type", "cpu") == "cuda"
+    while True:
+        try:
+            if on_gpu:
+                embeddings = model.encode(texts, batch_size=batch_size, convert_to_tensor=True, show_progress_bar=False, **kwargs)
+                return embeddings.float().cpu().numpy()
+            return model.encode(texts, batch_size=batch_size, convert_to_numpy=True, show_progress_bar=False, **kwargs)
+        except (RuntimeError, MemoryError) as e:
+            if batch_size <= 1 or not _is_out_of_memory(e):
+                raise
+            batch_size //= 2
+            try:
+                import torch
+                if torch.cuda.is_available():
+                    torch.cuda.empty_cache()
+            except ImportError:
+                pass
+            Logger.log(f"Out of memory while encoding {len(texts)} texts, retrying with batch_size={batch_size}")
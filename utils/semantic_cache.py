@@ -0,0 +1,82 @@
+from collections import OrderedDict
+from typing import Any, List, Optional
+import itertools
+import threading
+import time
+import numpy as np
+
+
+class SemanticCache:
+    """In-memory LRU of search results keyed by query embedding.
+
+    A lookup is a hit when an earlier query's normalized embedding has cosine >= threshold with the
+    new one and that entry answered at least as many results as requested, so repeated and
+    near-identical questions skip the vector search. Entries expire after ttl seconds.
+    """
+
+    def __init__(self, maxsize: int = 1024, threshold: float = 0.95, ttl: Optional[float] = 3600):
+        self.maxsize = maxsize
+        self.threshold = threshold
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # entry id -> (unit query vector, results, limit, time stored)
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._ids = itertools.count()
+        # Stacked vectors of the current entries, rebuilt lazily after a change
+        self._matrix: Optional[np.ndarray] = None
+        self._matrix_ids: List[int] = []
+
+    @staticmethod
+    def _unit(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def get(self, vector, limit: int) -> Optional[List[Any]]:
+        """Cached results of the most similar earlier query, or None on a miss"""
+        if self.maxsize <= 0:
+            return None
+        vector = self._unit(vector)
+        with self._lock:
+            self._expire()
+            if not self._entries:
+                return None
+            if self._matrix is None:
+                self._matrix_ids = list(self._entries)
+                self._matrix = np.stack([self._entries[entry_id][0] for entry_id in self._matrix_ids])
+            scores = self._matrix @ vector
+            for best in np.argsort(-scores).tolist():
+                if float(scores[best]) < self.threshold:
+                    break
+                entry_id = self._matrix_ids[best]
+                _, results, cached_limit, _ = self._entries[entry_id]
+                if cached_limit >= limit:
+                    self._entries.move_to_end(entry_id)
+                    return list(results[:limit])
+        return None
+
+    def put(self, vector, results: List[Any], limit: int):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[next(self._ids)] = (self._unit(vector), list(results), limit, time.monotonic())
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+            self._matrix = None
+
+    def clear(self):
+        """Drop every entry, e.g. after the underlying collection changed"""
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+
+    def _expire(self):
+        if self.ttl is None:
+            return
+        cutoff = time.monotonic() - self.ttl
+        expired = False
+        for entry_id in [entry_id for entry_id, entry in self._entries.items() if entry[3] < cutoff]:
+            del self._entries[entry_id]
+            expired = True
+        if expired:
+            self._matrix = None
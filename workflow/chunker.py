@@ -86,7 +86,7 @@ class DocumentChunker:
             return SemanticChunker(embedding_model_name=EMBEDDING_MODEL, cache_dir=CACHE_DIR), "semantic"
         elif choice == "3":
             llm = self._select_llm()
-            return AgenticChunker(llm, cache_dir=CACHE_DIR), "agentic"
+            return AgenticChunker(llm, cache_dir=CACHE_DIR, embedding_model_name=EMBEDDING_MODEL), "agentic"
         else:
             llm = self._select_llm()
             return AgenticChunkerV2(llm, cache_dir=CACHE_DIR), "agentic_v2"
@@ -3,7 +3,7 @@ Database Loader Workflow
 Handle loading chunks into databases
 """
 
-import json
+import orjson
 import os
 from typing import Dict, Tuple, Optional
 
@@ -144,8 +144,8 @@ class DatabaseLoader:
         """Load chunks from JSON"""
         Logger.log(f"Loading chunks from {json_file}...")
         
-        with open(json_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        with open(json_file, 'rb') as f:
+            data = orjson.loads(f.read())
         
         if isinstance(data, dict) and 'chunks' in data:
             chunks_data = data['chunks']
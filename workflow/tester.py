@@ -4,8 +4,9 @@ Combines testing logic and user interface for RAG component evaluation
 """
 
 import asyncio
-import json
 import os
+import sys
+import orjson
 from typing import List, Dict, Any, Tuple, Optional
 from datetime import datetime
 
@@ -49,6 +50,9 @@ class RAGComponentTester:
         self.config = config or Config()
         self.testset_path = testset_path
         self.all_results: List[Dict[str, Any]] = []
+        # One results file per run, named after the time the tester was created
+        self._run_started = datetime.now()
+        self._run_id = self._run_started.strftime('%Y%m%d_%H%M%S')
         
         # Initialize primary LLM for answer generation
         self.primary_llm = self._create_primary_llm(llm_type)
@@ -75,7 +79,7 @@ class RAGComponentTester:
         """Get all chunker configurations to test"""
         return [
             ("recursive", RecursiveChunker(cache_dir=CACHE_DIR)),
-            ("agentic", AgenticChunker(self.primary_llm, cache_dir=CACHE_DIR)),
+            ("agentic", AgenticChunker(self.primary_llm, cache_dir=CACHE_DIR, embedding_model_name=EMBEDDING_MODEL)),
             ("semantic", SemanticChunker(embedding_model_name=EMBEDDING_MODEL, cache_dir=CACHE_DIR))
         ]
     
@@ -148,7 +152,7 @@ class RAGComponentTester:
             )
             
             # Use RAGAS evaluator to evaluate the pipeline
-            result_data = self.evaluator.evaluate_pipeline(
+            result_data = await self.evaluator.evaluate_pipeline(
                 pipeline, 
                 config_name,
                 use_cache=use_cache,
@@ -265,18 +269,24 @@ class RAGComponentTester:
         
         chunker_configs = self._get_chunker_configs()
         
-        if clear_db and not skip_ingestion:
-            self._clear_all_databases(chunker_configs)
-        
-        if not skip_ingestion:
-            await self._ingest_documents(chunker_configs)
-        
-        await self._run_all_tests(chunker_configs, use_cache, skip_generation)
-        
-        Logger.log("\n" + "="*60)
-        Logger.log("ALL TESTS COMPLETED")
-        Logger.log("="*60)
+        # Per-question log lines are written in batches while the tests run
+        Logger.enable_buffering()
+        try:
+            if clear_db and not skip_ingestion:
+                self._clear_all_databases(chunker_configs)
+            
+            if not skip_ingestion:
+                await self._ingest_documents(chunker_configs)
+            
+            await self._run_all_tests(chunker_configs, use_cache, skip_generation)
+            
+            Logger.log("\n" + "="*60)
+            Logger.log("ALL TESTS COMPLETED")
+            Logger.log("="*60)
+        finally:
+            Logger.disable_buffering()
         
+        self._save_results()
         self._print_summary()
     
     async def test_individual_components(
@@ -303,18 +313,23 @@ class RAGComponentTester:
         all_chunker_configs = self._get_chunker_configs()
         chunker_configs = [(name, chunker) for name, chunker in all_chunker_configs if name in chunkers]
         
-        if clear_db and not skip_ingestion:
-            self._clear_all_databases(chunker_configs)
-        
-        if not skip_ingestion:
-            await self._ingest_documents(chunker_configs)
-        
-        await self._run_selected_tests(chunker_configs, databases, strategies, use_cache, skip_generation)
-        
-        Logger.log("\n" + "="*60)
-        Logger.log("INDIVIDUAL TESTS COMPLETED")
-        Logger.log("="*60)
+        Logger.enable_buffering()
+        try:
+            if clear_db and not skip_ingestion:
+                self._clear_all_databases(chunker_configs)
+            
+            if not skip_ingestion:
+                await self._ingest_documents(chunker_configs)
+            
+            await self._run_selected_tests(chunker_configs, databases, strategies, use_cache, skip_generation)
+            
+            Logger.log("\n" + "="*60)
+            Logger.log("INDIVIDUAL TESTS COMPLETED")
+            Logger.log("="*60)
+        finally:
+            Logger.disable_buffering()
         
+        self._save_results()
         self._print_summary()
     
     async def _run_selected_tests(
@@ -380,8 +395,7 @@ class RAGComponentTester:
                         skip_generation=skip_generation
                     )
                     
-                    self.all_results.append(result)
-                    self._save_results()
+                    self._record_result(result)
     
     async def _run_all_tests(self, chunker_configs: List[Tuple[str, Any]], use_cache: bool = True, skip_generation: bool = False):
         """Run tests on all configurations"""
@@ -418,60 +432,77 @@ class RAGComponentTester:
                         skip_generation=skip_generation
                     )
                     
-                    self.all_results.append(result)
-                    self._save_results()
+                    self._record_result(result)
+    
+    def _record_result(self, result: Dict[str, Any]):
+        """Keep a configuration result and append it to this run's JSON-lines file"""
+        self.all_results.append(result)
+        try:
+            results_dir = "./results"
+            os.makedirs(results_dir, exist_ok=True)
+            # One line per configuration, so nothing written earlier is serialized again
+            with open(os.path.join(results_dir, f"component_test_results_{self._run_id}.jsonl"), 'ab') as f:
+                f.write(orjson.dumps(result, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_APPEND_NEWLINE))
+        except Exception as e:
+            Logger.log(f"Error saving result: {e}")
     
     def _save_results(self):
-        """Save results to JSON file"""
+        """Save all results of this run to one JSON file"""
         results_dir = "./results"
         os.makedirs(results_dir, exist_ok=True)
         
-        output_file = os.path.join(results_dir, f"component_test_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+        output_file = os.path.join(results_dir, f"component_test_results_{self._run_id}.json")
         
         try:
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump({
-                    "test_date": datetime.now().isoformat(),
-                    "testset": self.testset_path,
-                    "num_questions": len(self.evaluator.questions),
-                    "results": self.all_results
-                }, f, indent=2, ensure_ascii=False)
+            data = orjson.dumps({
+                "test_date": self._run_started.isoformat(),
+                "testset": self.testset_path,
+                "num_questions": len(self.evaluator.questions),
+                "results": self.all_results
+            }, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY)
+            # Serialized in memory first, then swapped in whole so a crash never leaves half a file
+            tmp_file = output_file + ".tmp"
+            with open(tmp_file, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_file, output_file)
             
             Logger.log(f"Results saved to: {output_file}")
             
         except Exception as e:
             Logger.log(f"Error saving results: {e}")
     
-    def _print_configuration_result(self, result: Dict[str, Any]):
-        """Print a single configuration result"""
-        print(f"\n{result['configuration']}:")
-        print(f"  Chunker: {result['chunker']}")
-        print(f"  Database: {result['database']}")
-        print(f"  Search Strategy: {result['search_strategy']}")
-        print(f"  Scores:")
+    def _format_configuration_result(self, result: Dict[str, Any]) -> List[str]:
+        """Report lines for a single configuration result"""
+        lines = [
+            f"\n{result['configuration']}:",
+            f"  Chunker: {result['chunker']}",
+            f"  Database: {result['database']}",
+            f"  Search Strategy: {result['search_strategy']}",
+            f"  Scores:"
+        ]
         
         for metric, score in result['scores'].items():
             if score is not None:
-                print(f"    - {metric}: {score:.4f}")
+                lines.append(f"    - {metric}: {score:.4f}")
             else:
-                print(f"    - {metric}: Failed")
+                lines.append(f"    - {metric}: Failed")
         
         avg_score = self.evaluator.calculate_average_score(result['scores'])
         if avg_score is not None:
-            print(f"  Average Score: {avg_score:.4f}")
+            lines.append(f"  Average Score: {avg_score:.4f}")
+        return lines
     
     def _print_summary(self):
         """Print summary of all test results"""
-        print("\n" + "="*80)
-        print("TEST RESULTS SUMMARY")
-        print("="*80)
+        # Built as a list of lines and written once
+        lines = ["\n" + "="*80, "TEST RESULTS SUMMARY", "="*80]
         
         valid_results = [r for r in self.all_results if "error" not in r and r.get("scores")]
         
         for result in valid_results:
-            self._print_configuration_result(result)
+            lines.extend(self._format_configuration_result(result))
         
-        print("\n" + "="*80)
+        lines.append("\n" + "="*80)
         
         if valid_results:
             best_result = max(
@@ -479,9 +510,11 @@ class RAGComponentTester:
                 key=lambda r: self.evaluator.calculate_average_score(r['scores']) or 0
             )
             avg_score = self.evaluator.calculate_average_score(best_result['scores'])
-            print(f"\n🏆 BEST CONFIGURATION: {best_result['configuration']}")
+            lines.append(f"\n🏆 BEST CONFIGURATION: {best_result['configuration']}")
             if avg_score:
-                print(f"   Average Score: {avg_score:.4f}")
+                lines.append(f"   Average Score: {avg_score:.4f}")
+        
+        sys.stdout.write("\n".join(lines) + "\n")
 
 
 class ComponentTester: